@@ -6,8 +6,14 @@ via Python code instead of the web UI.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import copy
 import json
+import shutil
+import time
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Configuration
@@ -15,6 +21,16 @@ CHAT_API_URL = "http://localhost:5000/api/chat"
 EXPORT_API_URL = "http://localhost:5000/api/chat/export-csv"
 SUGGESTIONS_API_URL = "http://localhost:5000/api/chat/suggestions"
 
+# Shared session so repeated queries reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({'Content-Type': 'application/json'})
+SESSION.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+
+def _query_chat(message: str) -> dict:
+    """POST a message to the chat API; identical messages are answered from a TTL cache."""
+    return _CHAT_ANALYZER.query(message)
+
 
 def send_chat_message(message: str, print_response: bool = True) -> dict:
     """
@@ -27,29 +43,44 @@ def send_chat_message(message: str, print_response: bool = True) -> dict:
     Returns:
         Response dictionary with type, data, and message
     """
-    response = requests.post(
-        CHAT_API_URL,
-        headers={'Content-Type': 'application/json'},
-        json={'message': message}
-    )
-    
-    response.raise_for_status()
-    data = response.json()
+    data = _query_chat(message)
     
     if print_response:
-        print(f"\n{'='*60}")
-        print(f"Query: {message}")
-        print(f"{'='*60}")
-        print(f"Response: {data['response']}")
-        print(f"Type: {data['type']}")
+        lines = [
+            f"\n{'='*60}",
+            f"Query: {message}",
+            f"{'='*60}",
+            f"Response: {data['response']}",
+            f"Type: {data['type']}"
+        ]
         
         if 'data' in data and data['data']:
-            print(f"\nData Preview:")
-            print(json.dumps(data['data'], indent=2)[:500] + "...")
+            lines.append(f"\nData Preview:")
+            lines.append(json.dumps(data['data'], indent=2)[:500] + "...")
+        
+        print("\n".join(lines))
     
     return data
 
 
+def send_chat_messages(messages: list, max_workers: int = 8) -> list:
+    """
+    Send several independent messages concurrently.
+    
+    Args:
+        messages: Queries to ask the agent
+        max_workers: Maximum number of requests in flight
+    
+    Returns:
+        Response dictionaries in the same order as messages
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda message: send_chat_message(message, print_response=False),
+            messages
+        ))
+
+
 def export_to_csv(data_type: str = 'claims', output_file: str = None) -> str:
     """
     Export data to CSV file.
@@ -65,24 +96,22 @@ def export_to_csv(data_type: str = 'claims', output_file: str = None) -> str:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_file = f"{data_type}_export_{timestamp}.csv"
     
-    response = requests.post(
-        EXPORT_API_URL,
-        headers={'Content-Type': 'application/json'},
-        json={'data_type': data_type}
-    )
-    
-    response.raise_for_status()
-    
-    with open(output_file, 'wb') as f:
-        f.write(response.content)
+    with SESSION.post(EXPORT_API_URL, json={'data_type': data_type}, stream=True) as response:
+        response.raise_for_status()
+        
+        # Copy the raw stream to disk in 1 MB blocks instead of buffering it in memory
+        response.raw.decode_content = True
+        with open(output_file, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, length=1024 * 1024)
     
     print(f"✓ Exported to {output_file}")
     return output_file
 
 
+@lru_cache(maxsize=1)
 def get_suggestions() -> list:
-    """Get available query suggestions."""
-    response = requests.get(SUGGESTIONS_API_URL)
+    """Get available query suggestions (fetched once per process)."""
+    response = SESSION.get(SUGGESTIONS_API_URL)
     response.raise_for_status()
     return response.json()['suggestions']
 
@@ -216,15 +245,11 @@ def example_7_batch_queries():
         "Aggregate claims by status"
     ]
     
-    results = []
-    for query in queries:
-        print(f"\nProcessing: {query}")
-        result = send_chat_message(query, print_response=False)
-        results.append({
-            'query': query,
-            'type': result['type'],
-            'summary': result['response']
-        })
+    print(f"\nProcessing {len(queries)} queries concurrently...")
+    results = [
+        {'query': query, 'type': result['type'], 'summary': result['response']}
+        for query, result in zip(queries, send_chat_messages(queries))
+    ]
     
     print(f"\n{'='*60}")
     print("BATCH RESULTS SUMMARY")
@@ -241,10 +266,12 @@ def example_8_custom_analysis():
     print("EXAMPLE 8: Custom Analysis Report")
     print("="*60)
     
-    # Gather data from multiple sources
-    stats = send_chat_message("Show me claim statistics", print_response=False)
-    top_procs = send_chat_message("What are the top 5 procedures?", print_response=False)
-    trends = send_chat_message("Show monthly trends", print_response=False)
+    # Gather data from multiple sources in parallel
+    stats, top_procs, trends = send_chat_messages([
+        "Show me claim statistics",
+        "What are the top 5 procedures?",
+        "Show monthly trends"
+    ])
     
     # Build custom report
     print("\n" + "="*60)
@@ -329,19 +356,17 @@ def integrate_with_pandas():
     """
     Example: Convert chat agent results to pandas DataFrame
     """
-    import pandas as pd
-    
-    # Get trends data
-    result = send_chat_message("Show monthly trends", print_response=False)
+    # Get trends data as a DataFrame indexed by month
+    df = _CHAT_ANALYZER.get_monthly_trends_df()
     
-    if result['type'] == 'trends':
-        # Convert to DataFrame
-        df = pd.DataFrame(result['data']['trends'])
+    if not df.empty:
         print("\nTrends as DataFrame:")
         print(df)
         
         # Perform pandas operations
-        print(f"\nTotal claims: {df['claim_count'].sum()}")
+        totals = df[['claim_count', 'total_cost']].sum()
+        print(f"\nTotal claims: {int(totals['claim_count']):,}")
+        print(f"Total cost: ${totals['total_cost']:,.2f}")
         print(f"Average monthly cost: ${df['total_cost'].mean():,.2f}")
         
         return df
@@ -380,18 +405,50 @@ class ClaimsAnalyzer:
     Wrapper class for integrating the chat agent into larger applications
     """
     
-    def __init__(self, api_url: str = "http://localhost:5000/api/chat"):
+    def __init__(self, api_url: str = "http://localhost:5000/api/chat", cache_ttl: float = 60.0,
+                 session: requests.Session = None):
         self.api_url = api_url
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'Content-Type': 'application/json'})
+        self.session = session
+        self.cache_ttl = cache_ttl
+        self._cache = {}
     
     def query(self, message: str) -> dict:
-        """Send a query and return the result"""
-        response = requests.post(
-            self.api_url,
-            headers={'Content-Type': 'application/json'},
-            json={'message': message}
-        )
+        """Send a query and return a copy of the result (cached for cache_ttl seconds)"""
+        cached = self._cache.get(message)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return copy.deepcopy(cached[1])
+        
+        response = self.session.post(self.api_url, json={'message': message})
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        self._cache[message] = (time.monotonic(), result)
+        return copy.deepcopy(result)
+    
+    def gather_all(self, messages: list, max_workers: int = 8) -> list:
+        """Send several queries concurrently and return results in order"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.query, messages))
+    
+    def prefetch(self, top_limit: int = 10) -> None:
+        """Warm the cache for statistics, top procedures and trends in parallel"""
+        self.gather_all([
+            "Show me claim statistics",
+            f"What are the top {top_limit} procedures?",
+            "Show monthly trends"
+        ])
+    
+    def close(self) -> None:
+        """Close the underlying HTTP session"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
     
     def get_statistics(self) -> dict:
         """Get claim statistics"""
@@ -408,12 +465,24 @@ class ClaimsAnalyzer:
         result = self.query("Show monthly trends")
         return result['data']['trends'] if result['type'] == 'trends' else []
     
+    def get_monthly_trends_df(self):
+        """Get monthly trends as a pandas DataFrame indexed by month"""
+        import pandas as pd
+        
+        df = pd.DataFrame(self.get_monthly_trends(),
+                          columns=['month', 'claim_count', 'total_cost', 'avg_cost'])
+        return df.set_index('month')
+    
     def search_procedures(self, procedure_name: str) -> dict:
         """Search for specific procedures"""
         result = self.query(f"Find {procedure_name} claims")
         return result['data'] if result['type'] == 'search_results' else {}
 
 
+# Analyzer behind send_chat_message, on the module's shared session
+_CHAT_ANALYZER = ClaimsAnalyzer(CHAT_API_URL, session=SESSION)
+
+
 # Example usage of wrapper class
 def example_wrapper_class():
     """Demonstrate using the wrapper class"""
@@ -421,18 +490,20 @@ def example_wrapper_class():
     print("WRAPPER CLASS EXAMPLE")
     print("="*60)
     
-    analyzer = ClaimsAnalyzer()
-    
-    # Get statistics
-    stats = analyzer.get_statistics()
-    print(f"\nTotal Claims: {stats.get('total_claims', 0):,}")
-    
-    # Get top procedures
-    top_procs = analyzer.get_top_procedures(5)
-    print(f"\nTop 5 Procedures:")
-    for i, proc in enumerate(top_procs, 1):
-        print(f"  {i}. {proc['procedure']}")
-    
-    # Get trends
-    trends = analyzer.get_monthly_trends()
-    print(f"\nFound trends for {len(trends)} months")
+    with ClaimsAnalyzer() as analyzer:
+        # Fetch all three reports in parallel; the getters below hit the cache
+        analyzer.prefetch(top_limit=5)
+        
+        # Get statistics
+        stats = analyzer.get_statistics()
+        print(f"\nTotal Claims: {stats.get('total_claims', 0):,}")
+        
+        # Get top procedures
+        top_procs = analyzer.get_top_procedures(5)
+        print(f"\nTop 5 Procedures:")
+        for i, proc in enumerate(top_procs, 1):
+            print(f"  {i}. {proc['procedure']}")
+        
+        # Get trends
+        trends = analyzer.get_monthly_trends()
+        print(f"\nFound trends for {len(trends)} months")
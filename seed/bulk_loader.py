@@ -4,29 +4,168 @@ Handles hundreds of thousands of claims with batching, parallel processing, and
 """
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import argparse
 import hashlib
+import random
+import sqlite3
+import threading
+from itertools import chain, islice
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from collections import defaultdict
 
+# Optional accelerators; the loader falls back to the standard library
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Largest transaction Bundle sent in one request
+MAX_BUNDLE_ENTRIES = 200
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2
+
+STAT_KEYS = {
+    'Patient': 'patients_created',
+    'Practitioner': 'practitioners_created',
+    'Coverage': 'coverage_created',
+    'Claim': 'claims_created'
+}
+
+# Static parts of the dependency resources; shared by every resource built
+# and never mutated, so they are allocated once per process
+MD_QUALIFICATION = [{
+    "code": {
+        "coding": [{
+            "system": "http://terminology.hl7.org/CodeSystem/v2-0360",
+            "code": "MD"
+        }]
+    }
+}]
+
+# Canonical encoder for delta hashes (same bytes as json.dumps(sort_keys=True))
+HASH_ENCODER = json.JSONEncoder(sort_keys=True)
+
+
+def iter_claims(claims_file):
+    """Yield claims from a JSON array file one at a time.
+    
+    Uses ijson to stream the file when it is installed; otherwise falls back
+    to loading the whole array with json.load. A .ndjson file (one claim per
+    line) is always read line by line.
+    """
+    with open(claims_file, 'rb') as f:
+        if str(claims_file).endswith('.ndjson'):
+            yield from (loads(line) for line in f if line.strip())
+        elif ijson is None:
+            yield from json.load(f)
+        else:
+            yield from ijson.items(f, 'item', use_float=True)
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.dumps(obj).encode()
+    return orjson.dumps(obj)
+
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def claim_hash(claim):
+    """SHA-256 of a claim's canonical JSON, excluding _metadata."""
+    content = {k: v for k, v in claim.items() if k != '_metadata'}
+    return hashlib.sha256(HASH_ENCODER.encode(content).encode()).hexdigest()
+
+
+def open_hash_index(path):
+    """Open (creating if needed) the SQLite index of delta claim hashes."""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('CREATE TABLE IF NOT EXISTS hashes (key TEXT PRIMARY KEY, hash TEXT NOT NULL)')
+    return conn
+
+
+def batched(iterable, n):
+    """Yield successive lists of up to n items from any iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
 
 class BulkClaimLoader:
-    def __init__(self, fhir_base, batch_size=100, workers=4, max_retries=3):
+    def __init__(self, fhir_base, batch_size=100, workers=4, max_retries=3, http2=False):
         self.fhir_base = fhir_base.rstrip('/')
         self.batch_size = batch_size
         self.workers = workers
         self.max_retries = max_retries
-        self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/fhir+json'})
+        self.session = None
+        self.body_arg = 'data'
+        
+        if http2:
+            self.session = self.create_http2_client()
+        
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers.update({'Content-Type': 'application/fhir+json'})
+            
+            # Size the keep-alive pool to the worker count so concurrent batches
+            # reuse connections instead of discarding them once the default
+            # pool of 10 is full.
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 10))
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
         
         # Tracking
         self.stats = defaultdict(int)
         self.errors = []
+        self.stats_lock = threading.Lock()
         self.start_time = None
         
+        # Ids already upserted this run, keyed by resource type, so later
+        # batches skip re-sending the same Patient/Practitioner/Coverage
+        self.upserted = defaultdict(set)
+        self.upserted_lock = threading.Lock()
+        
+    def create_http2_client(self):
+        """Create a thread-safe httpx client that multiplexes requests over HTTP/2.
+        
+        HTTP/2 is negotiated via TLS ALPN, so it only applies to https:// servers;
+        plain http:// and servers without HTTP/2 fall back to HTTP/1.1. Returns
+        None when httpx[http2] is not installed.
+        """
+        try:
+            import httpx
+            import h2  # noqa: F401 - required by httpx for http2=True
+        except ImportError:
+            print("⚠ httpx[http2] is not installed; falling back to HTTP/1.1 (pip install 'httpx[http2]')")
+            return None
+        
+        self.body_arg = 'content'
+        connections = max(self.workers, 10)
+        return httpx.Client(
+            http2=True,
+            headers={'Content-Type': 'application/fhir+json'},
+            limits=httpx.Limits(max_connections=connections,
+                                max_keepalive_connections=connections)
+        )
+    
     def wait_for_server(self, timeout=60):
         """Wait for FHIR server to be ready."""
         print(f"Waiting for FHIR server at {self.fhir_base}...")
@@ -47,74 +186,102 @@ class BulkClaimLoader:
         
         raise Exception(f"FHIR server not ready after {timeout}s")
     
-    def create_resource(self, resource_type, resource_id, body, retries=0):
-        """Create or update a resource using PUT (upsert)."""
-        url = f"{self.fhir_base}/{resource_type}/{resource_id}"
+    def send_request(self, method, url, body, resource, timeout=30, retry_conflicts=False):
+        """Send a request, retrying transport errors and 429s with jittered backoff.
         
-        try:
-            resp = self.session.put(url, json=body, timeout=30)
+        With retry_conflicts, 409/412 and 5xx responses are retried the same
+        way. Returns the response on 200/201, otherwise records an error and
+        returns None.
+        """
+        data = dumps(body)
+        
+        for attempt in range(self.max_retries + 1):
+            retry = attempt < self.max_retries
             
-            if resp.status_code in [200, 201]:
-                return True
-            elif resp.status_code == 429 and retries < self.max_retries:
-                # Rate limited, wait and retry
-                time.sleep(2 ** retries)
-                return self.create_resource(resource_type, resource_id, body, retries + 1)
-            else:
-                self.errors.append({
-                    'resource': f"{resource_type}/{resource_id}",
-                    'status': resp.status_code,
-                    'error': resp.text[:200]
-                })
-                return False
-        except Exception as e:
-            if retries < self.max_retries:
-                time.sleep(2 ** retries)
-                return self.create_resource(resource_type, resource_id, body, retries + 1)
-            else:
-                self.errors.append({
-                    'resource': f"{resource_type}/{resource_id}",
+            try:
+                resp = self.session.request(method, url, timeout=timeout,
+                                            **{self.body_arg: data})
+            except Exception as e:
+                if retry:
+                    time.sleep(2 ** attempt + random.uniform(0, 0.25))
+                    continue
+                self.record(errors=[{
+                    'resource': resource,
                     'error': str(e)
-                })
-                return False
-    
-    def post_claim(self, claim, retries=0):
-        """Post a claim resource."""
-        url = f"{self.fhir_base}/Claim"
-        
-        try:
-            resp = self.session.post(url, json=claim, timeout=30)
+                }])
+                return None
             
             if resp.status_code in [200, 201]:
-                return True
-            elif resp.status_code == 429 and retries < self.max_retries:
-                time.sleep(2 ** retries)
-                return self.post_claim(claim, retries + 1)
-            else:
-                self.errors.append({
-                    'resource': 'Claim',
-                    'status': resp.status_code,
-                    'error': resp.text[:200]
-                })
-                return False
-        except Exception as e:
-            if retries < self.max_retries:
-                time.sleep(2 ** retries)
-                return self.post_claim(claim, retries + 1)
+                return resp
+            conflict = resp.status_code in (409, 412) or resp.status_code >= 500
+            if (resp.status_code == 429 or (retry_conflicts and conflict)) and retry:
+                # Rate limited, or a concurrent Bundle raced to create the
+                # same Patient/Coverage; wait and retry
+                time.sleep(2 ** attempt + random.uniform(0, 0.25))
+                continue
+            
+            self.record(errors=[{
+                'resource': resource,
+                'status': resp.status_code,
+                'error': resp.text[:200]
+            }])
+            return None
+    
+    def post_transaction(self, entries):
+        """Post a transaction Bundle and tally the per-entry results."""
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "transaction",
+            "entry": entries
+        }
+        
+        resp = self.send_request('POST', self.fhir_base, bundle,
+                                 f"Bundle ({len(entries)} entries)", timeout=120,
+                                 retry_conflicts=True)
+        if resp is None:
+            return False
+        
+        # Tally locally, then merge into the shared state once per Bundle
+        created = defaultdict(int)
+        upserted = defaultdict(list)
+        errors = []
+        
+        results = loads(resp.content).get('entry', [])
+        for entry, result in zip(entries, results):
+            resource_type = entry['resource']['resourceType']
+            status = result.get('response', {}).get('status', '')
+            if status.startswith(('200', '201')):
+                created[STAT_KEYS[resource_type]] += 1
+                if entry['request']['method'] == 'PUT':
+                    upserted[resource_type].append(entry['resource']['id'])
             else:
-                self.errors.append({
-                    'resource': 'Claim',
-                    'error': str(e)
+                errors.append({
+                    'resource': entry['request']['url'],
+                    'status': status
                 })
-                return False
-    
-    def create_patient(self, patient_data):
-        """Create a patient resource."""
-        patient_id = patient_data['id']
         
-        patient = {
+        self.record(created, errors)
+        for resource_type, resource_ids in upserted.items():
+            self.mark_upserted(resource_type, resource_ids)
+        return True
+    
+    def record(self, created=None, errors=None):
+        """Merge per-call counts and errors into the shared stats."""
+        with self.stats_lock:
+            for key, count in (created or {}).items():
+                self.stats[key] += count
+            self.errors.extend(errors or [])
+    
+    def mark_upserted(self, resource_type, resource_ids):
+        """Remember successfully upserted resources."""
+        with self.upserted_lock:
+            self.upserted[resource_type].update(resource_ids)
+    
+    def build_patient(self, patient_data):
+        """Build a patient resource."""
+        return {
             "resourceType": "Patient",
-            "id": patient_id,
+            "id": patient_data['id'],
             "name": [{
                 "use": "official",
                 "family": patient_data['last'],
@@ -129,45 +296,27 @@ class BulkClaimLoader:
                 "country": "USA"
             }]
         }
-        
-        if self.create_resource("Patient", patient_id, patient):
-            self.stats['patients_created'] += 1
-            return True
-        return False
     
-    def create_practitioner(self, prac_id):
-        """Create a practitioner resource."""
-        practitioner = {
+    def build_practitioner(self, prac_id):
+        """Build a practitioner resource."""
+        return {
             "resourceType": "Practitioner",
             "id": prac_id,
             "name": [{
                 "family": f"Provider-{prac_id.split('-')[1]}",
                 "given": ["Dr."]
             }],
-            "qualification": [{
-                "code": {
-                    "coding": [{
-                        "system": "http://terminology.hl7.org/CodeSystem/v2-0360",
-                        "code": "MD"
-                    }]
-                }
-            }]
+            "qualification": MD_QUALIFICATION
         }
-        
-        if self.create_resource("Practitioner", prac_id, practitioner):
-            self.stats['practitioners_created'] += 1
-            return True
-        return False
     
-    def create_coverage(self, coverage_id, patient_id, plan_name):
-        """Create a coverage resource."""
-        coverage = {
+    def build_coverage(self, coverage_id, patient_id, plan_name):
+        """Build a coverage resource."""
+        patient_ref = {"reference": f"Patient/{patient_id}"}
+        return {
             "resourceType": "Coverage",
             "id": coverage_id,
             "status": "active",
-            "beneficiary": {
-                "reference": f"Patient/{patient_id}"
-            },
+            "beneficiary": patient_ref,
             "type": {
                 "coding": [{
                     "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
@@ -175,15 +324,8 @@ class BulkClaimLoader:
                     "display": plan_name
                 }]
             },
-            "subscriber": {
-                "reference": f"Patient/{patient_id}"
-            }
+            "subscriber": patient_ref
         }
-        
-        if self.create_resource("Coverage", coverage_id, coverage):
-            self.stats['coverage_created'] += 1
-            return True
-        return False
     
     def process_claim_batch(self, claims_batch):
         """Process a batch of claims with their dependencies."""
@@ -197,11 +339,13 @@ class BulkClaimLoader:
             patient_id = metadata.get('patient_id')
             
             if patient_id and patient_id not in patients_needed:
+                display = claim['patient']['display']
+                name_parts = display.split() or ['']
                 patients_needed[patient_id] = {
                     'id': patient_id,
-                    'name': claim['patient']['display'],
-                    'first': claim['patient']['display'].split()[0],
-                    'last': claim['patient']['display'].split()[-1],
+                    'name': display,
+                    'first': name_parts[0],
+                    'last': name_parts[-1],
                     'gender': metadata.get('gender', 'M'),
                     'birth_date': '1980-01-01',  # Default
                     'city': metadata.get('city', 'Unknown'),
@@ -226,40 +370,64 @@ class BulkClaimLoader:
                             'plan_name': ins['coverage'].get('display', 'Unknown Plan')
                         }
         
-        # Create dependent resources
-        for patient_data in patients_needed.values():
-            self.create_patient(patient_data)
+        # Skip dependencies an earlier batch already upserted
+        with self.upserted_lock:
+            patients_needed = {pid: p for pid, p in patients_needed.items()
+                               if pid not in self.upserted['Patient']}
+            practitioners_needed -= self.upserted['Practitioner']
+            coverage_needed = {cid: c for cid, c in coverage_needed.items()
+                               if cid not in self.upserted['Coverage']}
         
-        for prac_id in practitioners_needed:
-            self.create_practitioner(prac_id)
+        # Upsert dependent resources ahead of the claims that reference them
+        resources = [self.build_patient(p) for p in patients_needed.values()]
+        resources += [self.build_practitioner(prac_id) for prac_id in practitioners_needed]
+        resources += [self.build_coverage(cov_id, cov_data['patient_id'], cov_data['plan_name'])
+                      for cov_id, cov_data in coverage_needed.items()]
         
-        for cov_id, cov_data in coverage_needed.items():
-            self.create_coverage(cov_id, cov_data['patient_id'], cov_data['plan_name'])
+        entries = [{
+            "resource": resource,
+            "request": {"method": "PUT", "url": f"{resource['resourceType']}/{resource['id']}"}
+        } for resource in resources]
         
-        # Post claims
+        # Post claims (metadata removed)
         for claim in claims_batch:
-            # Remove metadata before posting
             clean_claim = {k: v for k, v in claim.items() if k != '_metadata'}
-            if self.post_claim(clean_claim):
-                self.stats['claims_created'] += 1
+            entries.append({
+                "resource": clean_claim,
+                "request": {"method": "POST", "url": "Claim"}
+            })
+        
+        # One transaction per batch, split to stay under server limits
+        for i in range(0, len(entries), MAX_BUNDLE_ENTRIES):
+            self.post_transaction(entries[i:i + MAX_BUNDLE_ENTRIES])
     
     def load_claims(self, claims, skip_existing=False):
-        """Load claims in batches with parallel processing."""
+        """Load claims in batches with parallel processing.
+        
+        claims may be a list or any iterable, e.g. the stream from iter_claims.
+        """
         self.start_time = time.time()
-        total_claims = len(claims)
+        total_claims = len(claims) if hasattr(claims, '__len__') else None
         
-        print(f"\nLoading {total_claims:,} claims...")
+        if total_claims is None:
+            print("\nLoading claims (streaming)...")
+        else:
+            print(f"\nLoading {total_claims:,} claims...")
         print(f"Batch size: {self.batch_size}, Workers: {self.workers}")
         
-        # Split into batches
-        batches = [claims[i:i + self.batch_size] for i in range(0, len(claims), self.batch_size)]
+        processed = 0
+        last_report = self.start_time
+        batch_sizes = {}
+        total_label = f"{total_claims:,}" if total_claims is not None else "?"
         
-        # Process batches in parallel
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = {executor.submit(self.process_claim_batch, batch): i 
-                      for i, batch in enumerate(batches)}
-            
-            for i, future in enumerate(as_completed(futures)):
+        def report():
+            elapsed = time.time() - self.start_time
+            rate = self.stats['claims_created'] / elapsed if elapsed > 0 else 0
+            print(f"  Processed {processed:,}/{total_label} claims ({rate:.1f} claims/sec)")
+        
+        def finish(done):
+            nonlocal processed, last_report
+            for future in done:
                 try:
                     future.result()
                 except Exception as e:
@@ -267,84 +435,124 @@ class BulkClaimLoader:
                     print(f"Batch error: {e}")
                     if self.workers <= 2:  # Only print traceback in low concurrency mode
                         print(f"  Error details: {traceback.format_exc()}")
-                
-                # Progress reporting
-                processed = (i + 1) * self.batch_size
-                if processed % (self.batch_size * 10) == 0 or processed >= total_claims:
-                    elapsed = time.time() - self.start_time
-                    rate = self.stats['claims_created'] / elapsed if elapsed > 0 else 0
-                    print(f"  Processed {min(processed, total_claims):,}/{total_claims:,} claims "
-                          f"({rate:.1f} claims/sec)")
+                processed += batch_sizes.pop(future)
+            
+            # Progress reporting
+            now = time.time()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                report()
         
+        # Process batches in parallel, keeping at most two per worker in
+        # flight so a streamed input is never read far ahead of the upload
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            inflight = set()
+            for batch in batched(claims, self.batch_size):
+                future = executor.submit(self.process_claim_batch, batch)
+                batch_sizes[future] = len(batch)
+                inflight.add(future)
+                if len(inflight) >= 2 * self.workers:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    finish(done)
+            
+            finish(wait(inflight).done)
+        
+        report()
         self.print_summary()
     
     def load_delta(self, new_claims_file, existing_hash_file=None):
-        """Load only new or changed claims (delta update)."""
+        """Load only new or changed claims (delta update).
+        
+        Claim hashes are kept in a SQLite index (.hashes.db) that is looked up
+        per claim. An existing_hash_file .hashes.db is updated in place.
+        Otherwise the index starts empty in memory (or from a legacy
+        .hashes.json passed as existing_hash_file), and it is written to a new
+        .hashes.db next to the claims file once the changed claims are loaded.
+        """
         print("\n=== Delta Load Mode ===")
         
-        # Load new claims
-        with open(new_claims_file, 'r') as f:
-            new_claims = json.load(f)
+        legacy_json = existing_hash_file and Path(existing_hash_file).suffix == '.json'
+        in_place = existing_hash_file and not legacy_json
+        if in_place:
+            hash_file = Path(existing_hash_file)
+        else:
+            hash_file = Path(new_claims_file).with_suffix('.hashes.db')
         
-        # Load existing hashes if available
-        existing_hashes = {}
-        if existing_hash_file and Path(existing_hash_file).exists():
+        conn = open_hash_index(hash_file if in_place else ':memory:')
+        if legacy_json and Path(existing_hash_file).exists():
             with open(existing_hash_file, 'r') as f:
-                existing_hashes = json.load(f)
-            print(f"Loaded {len(existing_hashes):,} existing claim hashes")
-        
-        # Compute hashes for new claims
-        new_hashes = {}
-        claims_to_load = []
-        
-        for claim in new_claims:
-            # Create hash from claim content (excluding metadata)
-            claim_content = {k: v for k, v in claim.items() if k != '_metadata'}
-            claim_str = json.dumps(claim_content, sort_keys=True)
-            claim_hash = hashlib.sha256(claim_str.encode()).hexdigest()
-            
-            # Use patient + created date as key
-            key = f"{claim['patient']['reference']}_{claim['created']}"
-            new_hashes[key] = claim_hash
-            
-            # Include if new or changed
-            if key not in existing_hashes or existing_hashes[key] != claim_hash:
-                claims_to_load.append(claim)
+                conn.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?)',
+                                 json.load(f).items())
+            conn.commit()
+        
+        existing_count = conn.execute('SELECT COUNT(*) FROM hashes').fetchone()[0]
+        if existing_count:
+            print(f"Loaded {existing_count:,} existing claim hashes from {hash_file}")
+        
+        # Hash claims as they stream in from the file
+        updates = []
+        counts = defaultdict(int)
+        
+        def changed_claims():
+            for claim in iter_claims(new_claims_file):
+                counts['seen'] += 1
+                
+                # Use patient + created date as key
+                key = f"{claim['patient']['reference']}_{claim['created']}"
+                digest = claim_hash(claim)
+                
+                # Include if new or changed
+                row = conn.execute('SELECT hash FROM hashes WHERE key = ?', (key,)).fetchone()
+                if row is None or row[0] != digest:
+                    counts['changed'] += 1
+                    updates.append((key, digest))
+                    yield claim
         
-        print(f"New/changed claims: {len(claims_to_load):,} out of {len(new_claims):,}")
+        claims_to_load = changed_claims()
+        first = next(claims_to_load, None)
         
-        if claims_to_load:
-            self.load_claims(claims_to_load)
+        if first is not None:
+            self.load_claims(chain([first], claims_to_load))
+            print(f"New/changed claims: {counts['changed']:,} out of {counts['seen']:,}")
             
             # Save updated hashes
-            hash_file = Path(new_claims_file).with_suffix('.hashes.json')
-            with open(hash_file, 'w') as f:
-                json.dump(new_hashes, f)
+            conn.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?)', updates)
+            conn.commit()
+            if not in_place:
+                out = sqlite3.connect(hash_file)
+                conn.backup(out)
+                out.close()
             print(f"✓ Updated hashes saved to {hash_file}")
         else:
+            print(f"New/changed claims: 0 out of {counts['seen']:,}")
             print("No new claims to load")
+        
+        conn.close()
     
     def print_summary(self):
         """Print loading summary."""
         elapsed = time.time() - self.start_time
         
-        print("\n" + "=" * 60)
-        print("LOAD SUMMARY")
-        print("=" * 60)
-        print(f"Claims created:        {self.stats['claims_created']:,}")
-        print(f"Patients created:      {self.stats['patients_created']:,}")
-        print(f"Practitioners created: {self.stats['practitioners_created']:,}")
-        print(f"Coverage created:      {self.stats['coverage_created']:,}")
-        print(f"Errors:                {len(self.errors):,}")
-        print(f"Elapsed time:          {elapsed:.1f}s")
-        print(f"Average rate:          {self.stats['claims_created'] / elapsed:.1f} claims/sec")
-        print("=" * 60)
+        # Assemble the report and write it to stdout in one call
+        lines = [
+            "\n" + "=" * 60,
+            "LOAD SUMMARY",
+            "=" * 60,
+            f"Claims created:        {self.stats['claims_created']:,}",
+            f"Patients created:      {self.stats['patients_created']:,}",
+            f"Practitioners created: {self.stats['practitioners_created']:,}",
+            f"Coverage created:      {self.stats['coverage_created']:,}",
+            f"Errors:                {len(self.errors):,}",
+            f"Elapsed time:          {elapsed:.1f}s",
+            f"Average rate:          {self.stats['claims_created'] / elapsed:.1f} claims/sec",
+            "=" * 60
+        ]
         
         if self.errors and len(self.errors) <= 10:
-            print("\nErrors:")
-            for error in self.errors[:10]:
-                print(f"  {error}")
-
+            lines.append("\nErrors:")
+            lines.extend(f"  {error}" for error in self.errors[:10])
+        
+        print("\n".join(lines), flush=True)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Bulk load FHIR claims')
@@ -359,14 +567,19 @@ if __name__ == '__main__':
                        help='Skip waiting for server')
     parser.add_argument('--delta', action='store_true',
                        help='Load only new/changed claims')
-    parser.add_argument('--hash-file', help='Existing hash file for delta mode')
+    parser.add_argument('--hash-file',
+                       help='Hash index from a previous delta run, updated in place '
+                            '(default: start empty and write CLAIMS.hashes.db)')
+    parser.add_argument('--http2', action='store_true',
+                       help='Use HTTP/2 via httpx (https servers only)')
     
     args = parser.parse_args()
     
     loader = BulkClaimLoader(
         fhir_base=args.fhir_base,
         batch_size=args.batch_size,
-        workers=args.workers
+        workers=args.workers,
+        http2=args.http2
     )
     
     if not args.no_wait:
@@ -375,6 +588,4 @@ if __name__ == '__main__':
     if args.delta:
         loader.load_delta(args.claims_file, args.hash_file)
     else:
-        with open(args.claims_file, 'r') as f:
-            claims = json.load(f)
-        loader.load_claims(claims)
+        loader.load_claims(iter_claims(args.claims_file))
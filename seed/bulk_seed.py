@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
 import json
+import multiprocessing
 import os
 import sys
+import threading
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional accelerators: stream large claim files, encode bodies in C
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 DEFAULT_FHIR_BASE = os.environ.get("FHIR_BASE", "http://localhost:8080/fhir")
 CLAIMS_PATH_DEFAULT = os.environ.get(
@@ -16,51 +34,86 @@ CLAIMS_PATH_DEFAULT = os.environ.get(
 
 SESSION = requests.Session()
 SESSION.headers.update({"Content-Type": "application/fhir+json"})
+# One long-lived keep-alive pool; idempotent requests retry on gateway errors
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+
+# Entries for the next transaction Bundle: upserts keyed by reference so a
+# resource shared by several claims is only sent once, then the claims
+PENDING_UPSERTS: Dict[str, Dict[str, Any]] = {}
+PENDING_CLAIMS: List[Dict[str, Any]] = []
+
+# References whose upsert has committed; later Bundles can omit them
+UPSERTED_REFS: Set[str] = set()
+UPSERTED_LOCK = threading.Lock()
+
+# Spaces become dashes when deriving deterministic IDs from display names
+SLUG_TABLE = str.maketrans(" ", "-")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.dumps(obj).encode()
+    return orjson.dumps(obj)
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def probe(url: str) -> bool:
+    """True if url answers 200; streams so the response body is never downloaded."""
+    try:
+        with SESSION.get(url, timeout=8, stream=True) as r:
+            return r.status_code == 200
+    except requests.RequestException:
+        return False
 
 
 def wait_for_metadata(base_url: str, timeout: int = 60) -> bool:
     deadline = time.time() + timeout
-    md_url = f"{base_url.rstrip('/')}/metadata"
-    ping_url = f"{base_url.rstrip('/')}/Patient?_count=1"
-    health_url = f"{base_url.rstrip('/')}/actuator/health"
-    while time.time() < deadline:
-        try:
-            r = SESSION.get(md_url, timeout=8)
-            if r.status_code == 200:
-                return True
-        except requests.RequestException:
-            pass
-        try:
-            r2 = SESSION.get(ping_url, timeout=8)
-            if r2.status_code == 200:
-                return True
-        except requests.RequestException:
-            pass
-        try:
-            r3 = SESSION.get(health_url, timeout=8)
-            if r3.status_code == 200:
-                return True
-        except requests.RequestException:
-            pass
-        time.sleep(2)
-    return False
+    base = base_url.rstrip('/')
+    urls = [f"{base}/metadata", f"{base}/Patient?_count=1", f"{base}/actuator/health"]
+    # Race the three probes each cycle; the first healthy one wins and the
+    # slower ones are left to finish in the background
+    pool = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        while time.time() < deadline:
+            probes = [pool.submit(probe, url) for url in urls]
+            for fut in as_completed(probes):
+                if fut.result():
+                    return True
+            time.sleep(2)
+        return False
+    finally:
+        pool.shutdown(wait=False)
 
 
 def ensure_resource(resource_type: str, resource_id: str, body: Dict[str, Any]) -> str:
     """
-    Create or upsert a resource using PUT to allow client-defined IDs.
+    Queue a PUT upsert (client-defined ID) in the pending transaction Bundle.
     Returns the full reference string (e.g., "Patient/patient-123").
     """
-    url = f"{DEFAULT_FHIR_BASE.rstrip('/')}/{resource_type}/{resource_id}"
-    r = SESSION.put(url, data=json.dumps(body))
-    if r.status_code not in (200, 201):
-        print(f"WARN: Failed to upsert {resource_type}/{resource_id}: {r.status_code} {r.text[:200]}")
-    return f"{resource_type}/{resource_id}"
+    ref = f"{resource_type}/{resource_id}"
+    with UPSERTED_LOCK:
+        if ref in UPSERTED_REFS:
+            return ref
+    PENDING_UPSERTS[ref] = {"resource": body, "request": {"method": "PUT", "url": ref}}
+    return ref
 
 
 def upsert_patient_from_name(name: str) -> str:
     # Deterministic ID from name
-    safe = name.strip().lower().replace(" ", "-")
+    safe = name.strip().lower().translate(SLUG_TABLE)
     patient_id = f"patient-{safe}"
     body = {
         "resourceType": "Patient",
@@ -73,7 +126,7 @@ def upsert_patient_from_name(name: str) -> str:
 def upsert_practitioner(pract_ref: str) -> str:
     # Expect format "Practitioner/<id>"
     if not pract_ref.startswith("Practitioner/"):
-        pract_id = pract_ref.strip().lower().replace(" ", "-")
+        pract_id = pract_ref.strip().lower().translate(SLUG_TABLE)
         pract_ref = f"Practitioner/{pract_id}"
     pract_id = pract_ref.split("/", 1)[1]
     body = {
@@ -86,7 +139,7 @@ def upsert_practitioner(pract_ref: str) -> str:
 
 def upsert_coverage_for_patient(patient_ref: str, plan_name: str) -> str:
     # Deterministic coverage id from patient + plan name
-    safe_plan = plan_name.strip().lower().replace(" ", "-") if plan_name else "unknown"
+    safe_plan = plan_name.strip().lower().translate(SLUG_TABLE) if plan_name else "unknown"
     cov_id = f"cov-{patient_ref.split('/', 1)[1]}-{safe_plan}"
     body = {
         "resourceType": "Coverage",
@@ -98,8 +151,20 @@ def upsert_coverage_for_patient(patient_ref: str, plan_name: str) -> str:
     return ensure_resource("Coverage", cov_id, body)
 
 
+def claim_id_for(raw_claim: Dict[str, Any]) -> str:
+    """
+    Deterministic Claim ID: the source ID when present, otherwise a digest of
+    the claim content, so reruns update the same Claim instead of duplicating it.
+    """
+    if raw_claim.get("id"):
+        return str(raw_claim["id"])
+    digest = hashlib.blake2b(json.dumps(raw_claim, sort_keys=True).encode(), digest_size=8)
+    return f"claim-{digest.hexdigest()}"
+
+
 def transform_claim(raw_claim: Dict[str, Any]) -> Dict[str, Any]:
     claim = dict(raw_claim)  # shallow copy
+    claim["id"] = claim_id_for(raw_claim)
 
     # Patient reference
     patient_name = raw_claim.get("patient", {}).get("display") or "Demo Patient"
@@ -127,52 +192,221 @@ def transform_claim(raw_claim: Dict[str, Any]) -> Dict[str, Any]:
     return claim
 
 
-def post_claim(claim: Dict[str, Any]) -> Optional[str]:
-    url = f"{DEFAULT_FHIR_BASE.rstrip('/')}/Claim"
-    r = SESSION.post(url, data=json.dumps(claim))
-    if r.status_code in (200, 201):
-        try:
-            created = r.json()
-            return created.get("id")
-        except Exception:
-            return None
-    else:
-        print(f"ERROR: Failed to create Claim: {r.status_code} {r.text[:300]}")
-        return None
+def post_claim(claim: Dict[str, Any]) -> None:
+    """Queue an idempotent Claim PUT (deterministic ID) in the pending transaction Bundle."""
+    PENDING_CLAIMS.append({"resource": claim, "request": {"method": "PUT", "url": f"Claim/{claim['id']}"}})
+
 
+def take_pending() -> List[Dict[str, Any]]:
+    """Drain the queued upserts (first) and claims into one list of Bundle entries."""
+    entries = list(PENDING_UPSERTS.values()) + PENDING_CLAIMS
+    PENDING_UPSERTS.clear()
+    PENDING_CLAIMS.clear()
+    return entries
 
-def bulk_seed(claims_path: str, limit: Optional[int] = None, start: int = 0) -> None:
-    print(f"FHIR base: {DEFAULT_FHIR_BASE}")
-    if not wait_for_metadata(DEFAULT_FHIR_BASE, timeout=90):
-        print("ERROR: FHIR server not ready (metadata check failed)")
-        sys.exit(2)
 
-    with open(claims_path, "r") as f:
+def drop_existing(base_url: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Remove upserts of resources that already exist on the server, found with
+    one _id search per resource type, so a rerun does not rewrite them.
+    """
+    ids_by_type: Dict[str, List[str]] = {}
+    for entry in entries:
+        resource_type, resource_id = entry["request"]["url"].split("/", 1)
+        if resource_type != "Claim":
+            ids_by_type.setdefault(resource_type, []).append(resource_id)
+
+    existing: Set[str] = set()
+    for resource_type, ids in ids_by_type.items():
+        params = {"_id": ",".join(ids), "_elements": "id", "_count": len(ids)}
+        r = SESSION.get(f"{base_url}/{resource_type}", params=params, timeout=30)
+        if r.status_code != 200:
+            continue
+        for found in loads(r.content).get("entry", []):
+            existing.add(f"{resource_type}/{found['resource']['id']}")
+
+    if not existing:
+        return entries
+    with UPSERTED_LOCK:
+        UPSERTED_REFS.update(existing)
+    return [entry for entry in entries if entry["request"]["url"] not in existing]
+
+
+def post_bundle(
+    base_url: str,
+    entries: List[Dict[str, Any]],
+    retries: int = 3,
+    skip_existing: bool = False,
+) -> int:
+    """
+    POST entries as one transaction Bundle to base_url (no trailing slash).
+    With skip_existing, upserts of resources already on the server are dropped first.
+    Returns the number of Claims created or updated.
+    """
+    if skip_existing:
+        entries = drop_existing(base_url, entries)
+    if not entries:
+        return 0
+
+    bundle = {"resourceType": "Bundle", "type": "transaction", "entry": entries}
+    body = dumps(bundle)
+    for attempt in range(retries + 1):
+        r = SESSION.post(base_url, data=body, timeout=120)
+        if r.status_code in (200, 201):
+            break
+        # Concurrent Bundles can race to create the same Patient/Coverage;
+        # the loser succeeds on retry once the resource exists
+        if (r.status_code in (409, 412, 429) or r.status_code >= 500) and attempt < retries:
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        print(f"ERROR: Transaction of {len(entries)} entries failed: {r.status_code} {r.content[:300].decode('utf-8', 'replace')}")
+        return 0
+
+    results = loads(r.content).get("entry", [])
+    created = 0
+    upserted = []
+    for entry, result in zip(entries, results):
+        if not result.get("response", {}).get("status", "").startswith(("200", "201")):
+            continue
+        url = entry["request"]["url"]
+        if url.startswith("Claim/"):
+            created += 1
+        else:
+            upserted.append(url)
+
+    with UPSERTED_LOCK:
+        UPSERTED_REFS.update(upserted)
+    return created
+
+
+def iter_claims(claims_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield Claim resources from a JSON array file one at a time.
+    Streams with ijson when installed; otherwise loads the array with json.load.
+    A .ndjson file (one claim per line) is always read line by line.
+    """
+    with open(claims_path, "rb") as f:
+        if claims_path.endswith(".ndjson"):
+            yield from (loads(line) for line in f if line.strip())
+            return
+        if ijson is not None:
+            yield from ijson.items(f, "item", use_float=True)
+            return
         data = json.load(f)
     if not isinstance(data, list):
         print("ERROR: Claims file must be a JSON array of Claim resources")
         sys.exit(1)
-
-    total = len(data)
-    end = min(total, start + (limit or total))
+    yield from data
+
+
+def seed_range(
+    base_url: str,
+    claims_path: str,
+    start: int,
+    end: Optional[int],
+    batch_size: int,
+    workers: int,
+    quiet: bool = False,
+    skip_existing: bool = False,
+    shard: int = 0,
+    shards: int = 1,
+) -> Tuple[int, int]:
+    """
+    Seed claims [start, end) of the file over a small thread pool; with
+    shards > 1 only every shards-th claim from offset shard is seeded.
+    Progress lines are skipped when quiet; warnings are always printed.
+    Returns (claims seeded, claims read).
+    """
     count_ok = 0
-
-    for i in range(start, end):
-        raw = data[i]
-        try:
-            claim = transform_claim(raw)
-            claim_id = post_claim(claim)
-            if claim_id:
-                count_ok += 1
-                if count_ok % 50 == 0:
-                    print(f"Seeded {count_ok} claims...")
-            else:
-                print(f"WARN: Claim at index {i} failed to create")
-        except Exception as e:
-            print(f"WARN: Exception seeding claim {i}: {e}")
-
-    print(f"Done. Seeded {count_ok}/{end - start} claims from {claims_path}")
-
+    count_read = 0
+
+    def collect(done) -> None:
+        nonlocal count_ok
+        for future in done:
+            try:
+                count_ok += future.result()
+            except Exception as e:
+                print(f"WARN: Exception posting bundle: {e}")
+        if not quiet:
+            print(f"Seeded {count_ok} claims...")
+
+    # Post Bundles from a small thread pool, keeping at most two per worker in flight
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        inflight = set()
+
+        def submit() -> None:
+            nonlocal inflight
+            inflight.add(executor.submit(post_bundle, base_url, take_pending(), skip_existing=skip_existing))
+            if len(inflight) >= 2 * workers:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        for i, raw in enumerate(islice(iter_claims(claims_path), start, end), start):
+            if (i - start) % shards != shard:
+                continue
+            count_read += 1
+            try:
+                post_claim(transform_claim(raw))
+            except Exception as e:
+                print(f"WARN: Exception seeding claim {i}: {e}")
+
+            if len(PENDING_CLAIMS) >= batch_size:
+                submit()
+
+        if PENDING_CLAIMS:
+            submit()
+        collect(wait(inflight).done)
+
+    return count_ok, count_read
+
+
+def seed_shard(shard: Tuple[str, str, int, Optional[int], int, int, bool, bool, int, int]) -> Tuple[int, int]:
+    """Process-pool entry point: seed one round-robin shard on fresh connections."""
+    # Drop keep-alive sockets inherited from the parent on fork
+    SESSION.close()
+    return seed_range(*shard)
+
+
+def bulk_seed(
+    claims_path: str,
+    limit: Optional[int] = None,
+    start: int = 0,
+    batch_size: int = 100,
+    workers: int = 4,
+    processes: int = 1,
+    quiet: bool = False,
+    skip_existing: bool = False,
+) -> None:
+    base_url = DEFAULT_FHIR_BASE.rstrip('/')
+    print(f"FHIR base: {base_url}")
+    end = start + limit if limit else None
+
+    # Fork the shard processes before the readiness probes start threads
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        if not wait_for_metadata(base_url, timeout=90):
+            print("ERROR: FHIR server not ready (metadata check failed)")
+            sys.exit(2)
+
+        if pool is None:
+            count_ok, count_read = seed_range(
+                base_url, claims_path, start, end, batch_size, workers, quiet, skip_existing
+            )
+        else:
+            # Deal claims round-robin, one shard per process, so JSON parsing
+            # and encoding scale past the GIL; each process reads the file once
+            shards = [
+                (base_url, claims_path, start, end, batch_size, workers, quiet, skip_existing, shard, processes)
+                for shard in range(processes)
+            ]
+            results = pool.map(seed_shard, shards)
+            count_ok = sum(ok for ok, _ in results)
+            count_read = sum(read for _, read in results)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    print(f"Done. Seeded {count_ok}/{count_read} claims from {claims_path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bulk seed demo health claims into HAPI FHIR")
@@ -180,6 +414,11 @@ if __name__ == "__main__":
     parser.add_argument("--claims", dest="claims_path", default=CLAIMS_PATH_DEFAULT, help="Path to JSON array of Claim resources")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of claims to import")
     parser.add_argument("--start", type=int, default=0, help="Start index within the array")
+    parser.add_argument("--batch-size", type=int, default=100, help="Claims per transaction Bundle")
+    parser.add_argument("--workers", type=int, default=4, help="Bundles posted concurrently")
+    parser.add_argument("--processes", type=int, default=1, help="Split the claims into this many shards seeded by separate processes")
+    parser.add_argument("--quiet", action="store_true", help="Only print warnings, errors and the final summary")
+    parser.add_argument("--skip-existing", action="store_true", help="Look up Patients/Practitioners/Coverages first and only upsert missing ones (faster reruns)")
     parser.add_argument("--no-wait", action="store_true", help="Skip waiting for server readiness")
     args = parser.parse_args()
 
@@ -194,4 +433,13 @@ if __name__ == "__main__":
             return True
         wait_for_metadata = _no_wait  # type: ignore
 
-    bulk_seed(args.claims_path, limit=args.limit, start=args.start)
+    bulk_seed(
+        args.claims_path,
+        limit=args.limit,
+        start=args.start,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        processes=args.processes,
+        quiet=args.quiet,
+        skip_existing=args.skip_existing,
+    )
@@ -4,14 +4,31 @@ Creates female patients aged 50-74 with mammogram claims.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+from collections import Counter
+from functools import lru_cache
+import json
 import random
-import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 FHIR_BASE_URL = "http://localhost:8080/fhir"
 
 SESSION = requests.Session()
 SESSION.headers.update({"Content-Type": "application/fhir+json"})
+# One long-lived keep-alive pool; idempotent requests retry on gateway errors
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
 
 # Mammography CPT codes
 MAMMOGRAPHY_CODES = [
@@ -30,6 +47,100 @@ LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Mille
 INSURANCE_PLANS = ['Blue Cross PPO', 'Aetna HMO', 'Cigna PPO', 'UnitedHealthcare',
                    'Medicare', 'Medicaid', 'Humana']
 
+# Static sub-structures shared by every generated resource. They are only
+# ever serialized, never mutated, so building them once per process is safe.
+HIP_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
+        "code": "HIP",
+        "display": "health insurance plan policy"
+    }]
+}
+PLAN_CLASS_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/coverage-class",
+        "code": "plan"
+    }]
+}
+PROFESSIONAL_CLAIM_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/claim-type",
+        "code": "professional"
+    }]
+}
+NORMAL_PRIORITY = {
+    "coding": [{
+        "code": "normal"
+    }]
+}
+PROVIDER_REF = {
+    "reference": "Practitioner/prov-1"
+}
+MAMMOGRAPHY_SERVICES = {
+    code: {
+        "coding": [{
+            "system": "http://www.ama-assn.org/go/cpt",
+            "code": code,
+            "display": display
+        }]
+    }
+    for code, display in MAMMOGRAPHY_CODES
+}
+
+# Patients (with their coverage and claim) sent per transaction Bundle
+PATIENTS_PER_BUNDLE = 100
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.dumps(obj).encode()
+    return orjson.dumps(obj)
+
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def put_entry(resource):
+    """Wrap a resource as a PUT (upsert) entry of a transaction Bundle."""
+    return {
+        "resource": resource,
+        "request": {
+            "method": "PUT",
+            "url": f"{resource['resourceType']}/{resource['id']}"
+        }
+    }
+
+
+def post_bundle(entries):
+    """POST entries as one transaction Bundle and count successes per resource type."""
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": entries
+    }
+    
+    created = Counter()
+    try:
+        response = SESSION.post(FHIR_BASE_URL, data=dumps(bundle), timeout=120)
+        if response.status_code not in [200, 201]:
+            print(f"Failed to post bundle of {len(entries)} entries: {response.status_code} - {response.content[:200].decode('utf-8', 'replace')}")
+            return created
+        results = loads(response.content).get("entry", [])
+    # ValueError: the response body was not JSON
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Failed to post bundle of {len(entries)} entries: {e}")
+        return created
+    
+    for entry, result in zip(entries, results):
+        if result.get("response", {}).get("status", "").startswith(("200", "201")):
+            created[entry["resource"]["resourceType"]] += 1
+    return created
+
 
 def create_practitioner(practitioner_id, first_name, last_name):
     """Create a practitioner resource using PUT."""
@@ -54,7 +165,7 @@ def create_practitioner(practitioner_id, first_name, last_name):
     }
     
     url = f"{FHIR_BASE_URL}/Practitioner/{practitioner_id}"
-    response = SESSION.put(url, json=practitioner)
+    response = SESSION.put(url, data=dumps(practitioner))
     if response.status_code in [200, 201]:
         return practitioner_id
     else:
@@ -62,62 +173,44 @@ def create_practitioner(practitioner_id, first_name, last_name):
         return None
 
 
-def create_coverage(coverage_id, patient_id):
-    """Create a coverage (insurance) resource for a patient using PUT."""
-    plan_name = random.choice(INSURANCE_PLANS)
-    
+def build_coverage(coverage_id, patient_id, plan_name):
+    """Build a coverage (insurance) resource for a patient."""
+    patient_ref = {"reference": f"Patient/{patient_id}"}
     coverage = {
         "resourceType": "Coverage",
         "id": coverage_id,
         "status": "active",
-        "type": {
-            "coding": [{
-                "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
-                "code": "HIP",
-                "display": "health insurance plan policy"
-            }]
-        },
-        "subscriber": {
-            "reference": f"Patient/{patient_id}"
-        },
-        "beneficiary": {
-            "reference": f"Patient/{patient_id}"
-        },
+        "type": HIP_TYPE,
+        "subscriber": patient_ref,
+        "beneficiary": patient_ref,
         "payor": [{
             "display": plan_name
         }],
         "class": [{
-            "type": {
-                "coding": [{
-                    "system": "http://terminology.hl7.org/CodeSystem/coverage-class",
-                    "code": "plan"
-                }]
-            },
+            "type": PLAN_CLASS_TYPE,
             "value": plan_name
         }]
     }
     
-    url = f"{FHIR_BASE_URL}/Coverage/{coverage_id}"
-    response = SESSION.put(url, json=coverage)
-    if response.status_code in [200, 201]:
-        return coverage_id
-    else:
-        print(f"Failed to create coverage {coverage_id}: {response.status_code}")
-        return None
+    return coverage
 
 
-def create_patient(patient_id, age_min, age_max):
-    """Create a female patient with specified age range using PUT."""
-    age = random.randint(age_min, age_max)
-    birth_date = datetime.now() - timedelta(days=age*365)
-    first_name = random.choice(FIRST_NAMES)
-    last_name = random.choice(LAST_NAMES)
+@lru_cache(maxsize=1024)
+def claim_dates(days_ago, now):
+    """Return (servicedDate, created) strings for a claim days_ago before now."""
+    claim_date = now - timedelta(days=days_ago)
+    return claim_date.date().isoformat(), f"{claim_date.isoformat(timespec='seconds')}Z"
+
+
+def build_patient(patient_id, age, first_name, last_name, now):
+    """Build a female patient of the given age as of now."""
+    birth_date = now - timedelta(days=age*365)
     
     patient = {
         "resourceType": "Patient",
         "id": patient_id,
         "gender": "female",
-        "birthDate": birth_date.strftime("%Y-%m-%d"),
+        "birthDate": birth_date.date().isoformat(),
         "name": [{
             "family": last_name,
             "given": [first_name],
@@ -125,43 +218,26 @@ def create_patient(patient_id, age_min, age_max):
         }]
     }
     
-    url = f"{FHIR_BASE_URL}/Patient/{patient_id}"
-    response = SESSION.put(url, json=patient)
-    if response.status_code in [200, 201]:
-        return patient_id
-    else:
-        print(f"Failed to create patient {patient_id}: {response.status_code} - {response.text[:200]}")
-        return None
+    return patient
 
 
-def create_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago):
-    """Create a mammogram claim using PUT."""
-    claim_date = datetime.now() - timedelta(days=days_ago)
-    price = random.uniform(200, 400)
+def build_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago, price, now):
+    """Build a mammogram claim dated days_ago before now."""
+    service_date, created = claim_dates(days_ago, now)
+    amount = {"value": price, "currency": "USD"}
     
     claim = {
         "resourceType": "Claim",
         "id": claim_id,
         "status": "active",
-        "type": {
-            "coding": [{
-                "system": "http://terminology.hl7.org/CodeSystem/claim-type",
-                "code": "professional"
-            }]
-        },
+        "type": PROFESSIONAL_CLAIM_TYPE,
         "use": "claim",
         "patient": {
             "reference": f"Patient/{patient_id}"
         },
-        "created": claim_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        "provider": {
-            "reference": "Practitioner/prov-1"
-        },
-        "priority": {
-            "coding": [{
-                "code": "normal"
-            }]
-        },
+        "created": created,
+        "provider": PROVIDER_REF,
+        "priority": NORMAL_PRIORITY,
         "insurance": [{
             "sequence": 1,
             "focal": True,
@@ -171,36 +247,21 @@ def create_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago):
         }],
         "item": [{
             "sequence": 1,
-            "productOrService": {
+            "productOrService": MAMMOGRAPHY_SERVICES.get(cpt_code) or {
                 "coding": [{
                     "system": "http://www.ama-assn.org/go/cpt",
                     "code": cpt_code,
                     "display": cpt_display
                 }]
             },
-            "servicedDate": claim_date.strftime("%Y-%m-%d"),
-            "unitPrice": {
-                "value": price,
-                "currency": "USD"
-            },
-            "net": {
-                "value": price,
-                "currency": "USD"
-            }
+            "servicedDate": service_date,
+            "unitPrice": amount,
+            "net": amount
         }],
-        "total": {
-            "value": price,
-            "currency": "USD"
-        }
+        "total": amount
     }
     
-    url = f"{FHIR_BASE_URL}/Claim/{claim_id}"
-    response = SESSION.put(url, json=claim)
-    if response.status_code in [200, 201]:
-        return claim_id
-    else:
-        print(f"Failed to create claim {claim_id}: {response.status_code} - {response.text[:200]}")
-        return None
+    return claim
 
 
 def generate_bcs_claims(num_patients=1000, compliance_rate=0.75):
@@ -208,33 +269,48 @@ def generate_bcs_claims(num_patients=1000, compliance_rate=0.75):
     print(f"\n=== Generating {num_patients} patients for BCS measure ===")
     print(f"Target compliance rate: {compliance_rate * 100}%")
     created = 0
+    claims_created = 0
     claim_counter = 0
+    entries = []
+    
+    # One reference time for the whole run
+    now = datetime.now().replace(microsecond=0)
+    
+    # Draw every patient's random attributes up front in bulk
+    ages = random.choices(range(50, 75), k=num_patients)  # aged 50-74
+    first_names = random.choices(FIRST_NAMES, k=num_patients)
+    last_names = random.choices(LAST_NAMES, k=num_patients)
+    plans = random.choices(INSURANCE_PLANS, k=num_patients)
+    compliant = [random.random() < compliance_rate for _ in range(num_patients)]
+    mammograms = random.choices(MAMMOGRAPHY_CODES, k=num_patients)
+    days_ago_draws = random.choices(range(30, 821), k=num_patients)  # 30 days to 27 months
+    prices = [random.uniform(200, 400) for _ in range(num_patients)]
     
     for i in range(num_patients):
-        # Create female patient aged 50-74
+        # Create female patient aged 50-74, with coverage
         patient_id = f"bcs-patient-{i+1:06d}"
-        
-        if not create_patient(patient_id, 50, 74):
-            continue
-        
-        # Create coverage for patient
-        create_coverage(f"{patient_id}-coverage", patient_id)
+        entries.append(put_entry(build_patient(patient_id, ages[i], first_names[i], last_names[i], now)))
+        entries.append(put_entry(build_coverage(f"{patient_id}-coverage", patient_id, plans[i])))
         
         # Generate mammogram claim based on compliance rate
-        if random.random() < compliance_rate:
+        if compliant[i]:
             # Within 27 months (compliant)
-            days_ago = random.randint(30, 820)  # 30 days to 27 months
-            code, display = random.choice(MAMMOGRAPHY_CODES)
+            code, display = mammograms[i]
             claim_counter += 1
-            create_claim(f"bcs-claim-{claim_counter:06d}", patient_id, code, display, days_ago)
+            entries.append(put_entry(
+                build_claim(f"bcs-claim-{claim_counter:06d}", patient_id, code, display,
+                            days_ago_draws[i], prices[i], now)
+            ))
         # else: gap in care (no mammogram)
         
-        created += 1
-        if (i + 1) % 100 == 0:
+        if (i + 1) % PATIENTS_PER_BUNDLE == 0 or i + 1 == num_patients:
+            results = post_bundle(entries)
+            entries = []
+            created += results["Patient"]
+            claims_created += results["Claim"]
             print(f"  Created {i + 1}/{num_patients} BCS patients...")
-            time.sleep(0.1)  # Brief pause
     
-    print(f"✓ Created {created} BCS patients with {claim_counter} mammogram claims")
+    print(f"✓ Created {created} BCS patients with {claims_created} mammogram claims")
     print(f"Expected compliance: ~{compliance_rate * 100}%")
 
 
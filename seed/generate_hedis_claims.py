@@ -6,15 +6,31 @@ Generate claims data to support HEDIS quality measures:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from collections import Counter
 import random
-import time
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 FHIR_BASE_URL = "http://localhost:8080/fhir"
 
 SESSION = requests.Session()
 SESSION.headers.update({"Content-Type": "application/fhir+json"})
+# Keep-alive pool shared by the bundle workers; retries gateway errors
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
 
 # CPT Codes for measures
 COLONOSCOPY_CODES = [
@@ -61,6 +77,112 @@ LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Mille
 INSURANCE_PLANS = ['Blue Cross PPO', 'Aetna HMO', 'Cigna PPO', 'UnitedHealthcare', 
                    'Medicare', 'Medicaid', 'Humana']
 
+# Static sub-structures shared by every generated resource. They are only
+# ever serialized, never mutated, so building them once per process is safe.
+HIP_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
+        "code": "HIP",
+        "display": "health insurance plan policy"
+    }]
+}
+PLAN_CLASS_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/coverage-class",
+        "code": "plan"
+    }]
+}
+ACTIVE_CLINICAL_STATUS = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/condition-clinical",
+        "code": "active"
+    }]
+}
+PROFESSIONAL_CLAIM_TYPE = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/claim-type",
+        "code": "professional"
+    }]
+}
+NORMAL_PRIORITY = {
+    "coding": [{
+        "code": "normal"
+    }]
+}
+PROVIDER_REF = {
+    "reference": "Practitioner/prov-1"
+}
+
+# A transaction Bundle is sent once this many entries are pending
+ENTRIES_PER_BUNDLE = 200
+# Bundles posted concurrently; each holds whole patients, so they are independent
+BUNDLE_WORKERS = 8
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.dumps(obj).encode()
+    return orjson.dumps(obj)
+
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def put_entry(resource):
+    """Wrap a resource as a PUT (upsert) entry of a transaction Bundle."""
+    return {
+        "resource": resource,
+        "request": {
+            "method": "PUT",
+            "url": f"{resource['resourceType']}/{resource['id']}"
+        }
+    }
+
+
+def post_bundle(entries):
+    """POST entries as one transaction Bundle and count successes per resource type."""
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": entries
+    }
+    
+    created = Counter()
+    response = SESSION.post(FHIR_BASE_URL, data=dumps(bundle), timeout=120)
+    if response.status_code not in [200, 201]:
+        print(f"Failed to post bundle of {len(entries)} entries: {response.status_code} - {response.content[:200].decode('utf-8', 'replace')}")
+        created["failed_bundles"] += 1
+        return created
+    
+    for entry, result in zip(entries, loads(response.content).get("entry", [])):
+        if result.get("response", {}).get("status", "").startswith(("200", "201")):
+            created[entry["resource"]["resourceType"]] += 1
+    return created
+
+
+def collect_bundles(futures):
+    """
+    Wait for submitted post_bundle calls and total their per-type counts.
+    A Bundle that failed is counted under "failed_bundles" instead of
+    aborting the measure.
+    """
+    totals = Counter()
+    for future in as_completed(futures):
+        try:
+            totals.update(future.result())
+        # ValueError: the response body was not JSON
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Failed to post bundle: {e}")
+            totals["failed_bundles"] += 1
+    if totals["failed_bundles"]:
+        print(f"⚠ {totals['failed_bundles']} of {len(futures)} bundles failed")
+    return totals
+
 
 def create_practitioner(practitioner_id, first_name, last_name):
     """Create a practitioner resource using PUT."""
@@ -85,7 +207,7 @@ def create_practitioner(practitioner_id, first_name, last_name):
     }
     
     url = f"{FHIR_BASE_URL}/Practitioner/{practitioner_id}"
-    response = SESSION.put(url, json=practitioner)
+    response = SESSION.put(url, data=dumps(practitioner))
     if response.status_code in [200, 201]:
         return practitioner_id
     else:
@@ -93,54 +215,34 @@ def create_practitioner(practitioner_id, first_name, last_name):
         return None
 
 
-def create_coverage(coverage_id, patient_id):
-    """Create a coverage (insurance) resource for a patient using PUT."""
+def build_coverage(coverage_id, patient_id):
+    """Build a coverage (insurance) resource for a patient."""
     plan_name = random.choice(INSURANCE_PLANS)
+    patient_ref = {"reference": f"Patient/{patient_id}"}
     
     coverage = {
         "resourceType": "Coverage",
         "id": coverage_id,
         "status": "active",
-        "type": {
-            "coding": [{
-                "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
-                "code": "HIP",
-                "display": "health insurance plan policy"
-            }]
-        },
-        "subscriber": {
-            "reference": f"Patient/{patient_id}"
-        },
-        "beneficiary": {
-            "reference": f"Patient/{patient_id}"
-        },
+        "type": HIP_TYPE,
+        "subscriber": patient_ref,
+        "beneficiary": patient_ref,
         "payor": [{
             "display": plan_name
         }],
         "class": [{
-            "type": {
-                "coding": [{
-                    "system": "http://terminology.hl7.org/CodeSystem/coverage-class",
-                    "code": "plan"
-                }]
-            },
+            "type": PLAN_CLASS_TYPE,
             "value": plan_name
         }]
     }
     
-    url = f"{FHIR_BASE_URL}/Coverage/{coverage_id}"
-    response = SESSION.put(url, json=coverage)
-    if response.status_code in [200, 201]:
-        return coverage_id
-    else:
-        print(f"Failed to create coverage {coverage_id}: {response.status_code}")
-        return None
+    return coverage
 
 
-def create_patient(patient_id, gender, age_min, age_max):
-    """Create a patient with specified gender and age range using PUT."""
+def build_patient(patient_id, gender, age_min, age_max, now):
+    """Build a patient with specified gender and age range as of now."""
     age = random.randint(age_min, age_max)
-    birth_date = datetime.now() - timedelta(days=age*365)
+    birth_date = now - timedelta(days=age*365)
     first_name = random.choice(FIRST_NAMES)
     last_name = random.choice(LAST_NAMES)
     
@@ -148,7 +250,7 @@ def create_patient(patient_id, gender, age_min, age_max):
         "resourceType": "Patient",
         "id": patient_id,
         "gender": gender,
-        "birthDate": birth_date.strftime("%Y-%m-%d"),
+        "birthDate": birth_date.date().isoformat(),
         "name": [{
             "family": last_name,
             "given": [first_name],
@@ -156,26 +258,15 @@ def create_patient(patient_id, gender, age_min, age_max):
         }]
     }
     
-    url = f"{FHIR_BASE_URL}/Patient/{patient_id}"
-    response = SESSION.put(url, json=patient)
-    if response.status_code in [200, 201]:
-        return patient_id
-    else:
-        print(f"Failed to create patient {patient_id}: {response.status_code} - {response.text[:200]}")
-        return None
+    return patient
 
 
-def create_condition(condition_id, patient_id, code, display):
-    """Create a condition (diagnosis) for a patient using PUT."""
+def build_condition(condition_id, patient_id, code, display, now):
+    """Build a condition (diagnosis) for a patient, with onset before now."""
     condition = {
         "resourceType": "Condition",
         "id": condition_id,
-        "clinicalStatus": {
-            "coding": [{
-                "system": "http://terminology.hl7.org/CodeSystem/condition-clinical",
-                "code": "active"
-            }]
-        },
+        "clinicalStatus": ACTIVE_CLINICAL_STATUS,
         "code": {
             "coding": [{
                 "system": "http://hl7.org/fhir/sid/icd-10",
@@ -187,46 +278,30 @@ def create_condition(condition_id, patient_id, code, display):
         "subject": {
             "reference": f"Patient/{patient_id}"
         },
-        "onsetDateTime": (datetime.now() - timedelta(days=random.randint(180, 1095))).isoformat()
+        "onsetDateTime": (now - timedelta(days=random.randint(180, 1095))).isoformat()
     }
     
-    url = f"{FHIR_BASE_URL}/Condition/{condition_id}"
-    response = SESSION.put(url, json=condition)
-    if response.status_code in [200, 201]:
-        return condition_id
-    else:
-        print(f"Failed to create condition {condition_id}: {response.status_code} - {response.text[:200]}")
-    return None
+    return condition
 
 
-def create_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago):
-    """Create a claim with specified CPT code using PUT."""
-    claim_date = datetime.now() - timedelta(days=days_ago)
+def build_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago, now):
+    """Build a claim with specified CPT code, dated days_ago before now."""
+    claim_date = now - timedelta(days=days_ago)
     price = random.uniform(100, 500)
+    amount = {"value": price, "currency": "USD"}
     
     claim = {
         "resourceType": "Claim",
         "id": claim_id,
         "status": "active",
-        "type": {
-            "coding": [{
-                "system": "http://terminology.hl7.org/CodeSystem/claim-type",
-                "code": "professional"
-            }]
-        },
+        "type": PROFESSIONAL_CLAIM_TYPE,
         "use": "claim",
         "patient": {
             "reference": f"Patient/{patient_id}"
         },
-        "created": claim_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        "provider": {
-            "reference": "Practitioner/prov-1"
-        },
-        "priority": {
-            "coding": [{
-                "code": "normal"
-            }]
-        },
+        "created": f"{claim_date.isoformat(timespec='seconds')}Z",
+        "provider": PROVIDER_REF,
+        "priority": NORMAL_PRIORITY,
         "insurance": [{
             "sequence": 1,
             "focal": True,
@@ -243,145 +318,139 @@ def create_claim(claim_id, patient_id, cpt_code, cpt_display, days_ago):
                     "display": cpt_display
                 }]
             },
-            "servicedDate": claim_date.strftime("%Y-%m-%d"),
-            "unitPrice": {
-                "value": price,
-                "currency": "USD"
-            },
-            "net": {
-                "value": price,
-                "currency": "USD"
-            }
+            "servicedDate": claim_date.date().isoformat(),
+            "unitPrice": amount,
+            "net": amount
         }],
-        "total": {
-            "value": price,
-            "currency": "USD"
-        }
+        "total": amount
     }
     
-    url = f"{FHIR_BASE_URL}/Claim/{claim_id}"
-    response = SESSION.put(url, json=claim)
-    if response.status_code in [200, 201]:
-        return claim_id
-    else:
-        print(f"Failed to create claim {claim_id}: {response.status_code} - {response.text[:200]}")
-        return None
+    return claim
 
 
 def generate_col_claims(num_patients=1000):
     """Generate Colorectal Cancer Screening claims."""
     print(f"\n=== Generating {num_patients} patients for COL measure ===")
-    created = 0
+    now = datetime.now()  # one reference time for the whole measure
     claim_counter = 0
+    entries = []
+    futures = []
     
-    for i in range(num_patients):
-        # Create patient aged 45-75
-        gender = random.choice(["male", "female"])
-        patient_id = f"col-patient-{i+1:06d}"
-        
-        if not create_patient(patient_id, gender, 45, 75):
-            continue
-        
-        # Create coverage for patient
-        create_coverage(f"{patient_id}-coverage", patient_id)
-        
-        # 70% get colonoscopy (10 year lookback - compliant)
-        if random.random() < 0.7:
-            days_ago = random.randint(30, 3650)  # Within 10 years
-            code, display = random.choice(COLONOSCOPY_CODES)
-            claim_counter += 1
-            create_claim(f"col-claim-{claim_counter:06d}", patient_id, code, display, days_ago)
-        # 20% get FIT test (1 year lookback - compliant)
-        elif random.random() < 0.67:  # 20% of remaining 30%
-            days_ago = random.randint(30, 365)  # Within 1 year
-            code, display = random.choice(FIT_TEST_CODES)
-            claim_counter += 1
-            create_claim(f"col-claim-{claim_counter:06d}", patient_id, code, display, days_ago)
-        # 10% get nothing (gap in care)
+    with ThreadPoolExecutor(max_workers=BUNDLE_WORKERS) as executor:
+        for i in range(num_patients):
+            # Create patient aged 45-75, with coverage
+            gender = random.choice(["male", "female"])
+            patient_id = f"col-patient-{i+1:06d}"
+            entries.append(put_entry(build_patient(patient_id, gender, 45, 75, now)))
+            entries.append(put_entry(build_coverage(f"{patient_id}-coverage", patient_id)))
+            
+            # 70% get colonoscopy (10 year lookback - compliant)
+            if random.random() < 0.7:
+                days_ago = random.randint(30, 3650)  # Within 10 years
+                code, display = random.choice(COLONOSCOPY_CODES)
+                claim_counter += 1
+                entries.append(put_entry(build_claim(f"col-claim-{claim_counter:06d}", patient_id, code, display, days_ago, now)))
+            # 20% get FIT test (1 year lookback - compliant)
+            elif random.random() < 0.67:  # 20% of remaining 30%
+                days_ago = random.randint(30, 365)  # Within 1 year
+                code, display = random.choice(FIT_TEST_CODES)
+                claim_counter += 1
+                entries.append(put_entry(build_claim(f"col-claim-{claim_counter:06d}", patient_id, code, display, days_ago, now)))
+            # 10% get nothing (gap in care)
+            
+            if len(entries) >= ENTRIES_PER_BUNDLE or i + 1 == num_patients:
+                futures.append(executor.submit(post_bundle, entries))
+                entries = []
+            if (i + 1) % 100 == 0:
+                print(f"  Generated {i + 1}/{num_patients} COL patients...")
         
-        created += 1
-        if (i + 1) % 100 == 0:
-            print(f"  Created {i + 1}/{num_patients} COL patients...")
-            time.sleep(0.1)  # Brief pause
-    
-    print(f"✓ Created {created} COL patients with {claim_counter} screening claims")
+        results = collect_bundles(futures)
+    created = results["Patient"]
+    claims_created = results["Claim"]
+    print(f"✓ Created {created} COL patients with {claims_created} screening claims")
 
 
 def generate_cdc_claims(num_patients=1000):
     """Generate Comprehensive Diabetes Care claims."""
     print(f"\n=== Generating {num_patients} patients for CDC measure ===")
-    created = 0
+    now = datetime.now()  # one reference time for the whole measure
     claim_counter = 0
+    entries = []
+    futures = []
     
-    for i in range(num_patients):
-        # Create patient aged 18-75
-        gender = random.choice(["male", "female"])
-        patient_id = f"cdc-patient-{i+1:06d}"
-        
-        if not create_patient(patient_id, gender, 18, 75):
-            continue
-        
-        # Create coverage for patient
-        create_coverage(f"{patient_id}-coverage", patient_id)
-        
-        # Add diabetes diagnosis
-        diabetes_code, diabetes_display = random.choice(DIABETES_CODES)
-        create_condition(f"cdc-cond-{i+1:06d}", patient_id, diabetes_code, diabetes_display)
-        
-        # 75% get HbA1c test in last year (compliant)
-        if random.random() < 0.75:
-            days_ago = random.randint(30, 365)
-            code, display = random.choice(HBA1C_CODES)
-            claim_counter += 1
-            create_claim(f"cdc-claim-{claim_counter:06d}", patient_id, code, display, days_ago)
-        # 25% don't get tested (gap in care)
+    with ThreadPoolExecutor(max_workers=BUNDLE_WORKERS) as executor:
+        for i in range(num_patients):
+            # Create patient aged 18-75, with coverage
+            gender = random.choice(["male", "female"])
+            patient_id = f"cdc-patient-{i+1:06d}"
+            entries.append(put_entry(build_patient(patient_id, gender, 18, 75, now)))
+            entries.append(put_entry(build_coverage(f"{patient_id}-coverage", patient_id)))
+            
+            # Add diabetes diagnosis
+            diabetes_code, diabetes_display = random.choice(DIABETES_CODES)
+            entries.append(put_entry(build_condition(f"cdc-cond-{i+1:06d}", patient_id, diabetes_code, diabetes_display, now)))
+            
+            # 75% get HbA1c test in last year (compliant)
+            if random.random() < 0.75:
+                days_ago = random.randint(30, 365)
+                code, display = random.choice(HBA1C_CODES)
+                claim_counter += 1
+                entries.append(put_entry(build_claim(f"cdc-claim-{claim_counter:06d}", patient_id, code, display, days_ago, now)))
+            # 25% don't get tested (gap in care)
+            
+            if len(entries) >= ENTRIES_PER_BUNDLE or i + 1 == num_patients:
+                futures.append(executor.submit(post_bundle, entries))
+                entries = []
+            if (i + 1) % 100 == 0:
+                print(f"  Generated {i + 1}/{num_patients} CDC patients...")
         
-        created += 1
-        if (i + 1) % 100 == 0:
-            print(f"  Created {i + 1}/{num_patients} CDC patients...")
-            time.sleep(0.1)
-    
-    print(f"✓ Created {created} CDC patients with {claim_counter} HbA1c claims")
+        results = collect_bundles(futures)
+    created = results["Patient"]
+    claims_created = results["Claim"]
+    print(f"✓ Created {created} CDC patients with {claims_created} HbA1c claims")
 
 
 def generate_cbp_claims(num_patients=1000):
     """Generate Controlling Blood Pressure claims."""
     print(f"\n=== Generating {num_patients} patients for CBP measure ===")
-    created = 0
+    now = datetime.now()  # one reference time for the whole measure
     claim_counter = 0
+    entries = []
+    futures = []
     
-    for i in range(num_patients):
-        # Create patient aged 18-85
-        gender = random.choice(["male", "female"])
-        patient_id = f"cbp-patient-{i+1:06d}"
-        
-        if not create_patient(patient_id, gender, 18, 85):
-            continue
-        
-        # Create coverage for patient
-        create_coverage(f"{patient_id}-coverage", patient_id)
-        
-        # Add hypertension diagnosis
-        htn_code, htn_display = random.choice(HYPERTENSION_CODES)
-        create_condition(f"cbp-cond-{i+1:06d}", patient_id, htn_code, htn_display)
+    with ThreadPoolExecutor(max_workers=BUNDLE_WORKERS) as executor:
+        for i in range(num_patients):
+            # Create patient aged 18-85, with coverage
+            gender = random.choice(["male", "female"])
+            patient_id = f"cbp-patient-{i+1:06d}"
+            entries.append(put_entry(build_patient(patient_id, gender, 18, 85, now)))
+            entries.append(put_entry(build_coverage(f"{patient_id}-coverage", patient_id)))
+            
+            # Add hypertension diagnosis
+            htn_code, htn_display = random.choice(HYPERTENSION_CODES)
+            entries.append(put_entry(build_condition(f"cbp-cond-{i+1:06d}", patient_id, htn_code, htn_display, now)))
+            
+            # 70% have office visits with BP monitoring (controlled - compliant)
+            if random.random() < 0.7:
+                # Create 2-3 office visits in the past year
+                num_visits = random.randint(2, 3)
+                for visit_num in range(num_visits):
+                    days_ago = random.randint(30, 365)
+                    code, display = random.choice(BP_OFFICE_VISIT_CODES)
+                    claim_counter += 1
+                    entries.append(put_entry(build_claim(f"cbp-claim-{claim_counter:06d}", patient_id, code, display, days_ago, now)))
+            # 30% don't have recent visits (gap in care)
+            
+            if len(entries) >= ENTRIES_PER_BUNDLE or i + 1 == num_patients:
+                futures.append(executor.submit(post_bundle, entries))
+                entries = []
+            if (i + 1) % 100 == 0:
+                print(f"  Generated {i + 1}/{num_patients} CBP patients...")
         
-        # 70% have office visits with BP monitoring (controlled - compliant)
-        if random.random() < 0.7:
-            # Create 2-3 office visits in the past year
-            num_visits = random.randint(2, 3)
-            for visit_num in range(num_visits):
-                days_ago = random.randint(30, 365)
-                code, display = random.choice(BP_OFFICE_VISIT_CODES)
-                claim_counter += 1
-                create_claim(f"cbp-claim-{claim_counter:06d}", patient_id, code, display, days_ago)
-        # 30% don't have recent visits (gap in care)
-        
-        created += 1
-        if (i + 1) % 100 == 0:
-            print(f"  Created {i + 1}/{num_patients} CBP patients...")
-            time.sleep(0.1)
-    
-    print(f"✓ Created {created} CBP patients with {claim_counter} office visit claims")
+        results = collect_bundles(futures)
+    created = results["Patient"]
+    claims_created = results["Claim"]
+    print(f"✓ Created {created} CBP patients with {claims_created} office visit claims")
 
 
 def main():
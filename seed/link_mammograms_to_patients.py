@@ -4,13 +4,31 @@ Link mammogram claims to regular female patients (patient-*)
 to populate HEDIS Breast Cancer Screening measure.
 """
 
+import json
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from datetime import date, datetime, timedelta
 import random
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# Optional accelerator for parsing search Bundles
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 FHIR_BASE = 'http://localhost:8080/fhir'
 
+# Claims per transaction Bundle POST
+CLAIMS_PER_BUNDLE = 100
+
+SESSION = requests.Session()
+SESSION.headers.update({'Content-Type': 'application/fhir+json', 'Accept': 'application/fhir+json'})
+# One keep-alive connection per worker thread instead of a new one per request
+_ADAPTER = HTTPAdapter(pool_maxsize=10)
+SESSION.mount('http://', _ADAPTER)
+SESSION.mount('https://', _ADAPTER)
+
 # Mammogram CPT codes for HEDIS BCS
 MAMMOGRAM_CODES = [
     {'code': '77065', 'display': 'Diagnostic mammography, including CAD; unilateral'},
@@ -19,46 +37,75 @@ MAMMOGRAM_CODES = [
     {'code': '77063', 'display': 'Screening digital breast tomosynthesis, bilateral'},
 ]
 
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
 def get_female_patients():
     """Fetch female patients aged 50-74."""
     print("Fetching female patients aged 50-74...")
     patients = []
     
-    response = requests.get(f'{FHIR_BASE}/Patient?gender=female&_count=1000')
-    data = response.json()
+    # HEDIS BCS eligible: women 50-74, i.e. (today - birthDate).days // 365
+    # between 50 and 74. The server applies it as a birthdate range search.
+    today = datetime.now()
+    today_ordinal = today.toordinal()
+    oldest = (today - timedelta(days=75 * 365)).strftime('%Y-%m-%d')
+    youngest = (today - timedelta(days=50 * 365)).strftime('%Y-%m-%d')
+    url = f'{FHIR_BASE}/Patient'
+    params = {
+        'gender': 'female',
+        'birthdate': [f'gt{oldest}', f'le{youngest}'],
+        '_count': 1000,
+        '_elements': 'id,name,birthDate'
+    }
     
-    for entry in data.get('entry', []):
-        patient = entry['resource']
-        birth_date_str = patient.get('birthDate')
-        if birth_date_str:
-            birth_date = datetime.strptime(birth_date_str, '%Y-%m-%d')
-            age = (datetime.now() - birth_date).days // 365
+    while url:
+        response = SESSION.get(url, params=params)
+        data = loads(response.content)
+        
+        for entry in data.get('entry', []):
+            patient = entry['resource']
+            age = (today_ordinal - date.fromisoformat(patient['birthDate']).toordinal()) // 365
+            
+            name_parts = patient.get('name', [{}])[0]
+            name = f"{name_parts.get('given', [''])[0]} {name_parts.get('family', '')}".strip()
             
-            # HEDIS BCS eligible: women 50-74
-            if 50 <= age <= 74:
-                name_parts = patient.get('name', [{}])[0]
-                name = f"{name_parts.get('given', [''])[0]} {name_parts.get('family', '')}".strip()
-                
-                patients.append({
-                    'id': patient['id'],
-                    'name': name or patient['id'],
-                    'age': age
-                })
+            patients.append({
+                'id': patient['id'],
+                'name': name or patient['id'],
+                'age': age
+            })
+        
+        # Follow paging; the next link already carries the search parameters
+        url = next((link['url'] for link in data.get('link', []) if link.get('relation') == 'next'), None)
+        params = None
     
     print(f"Found {len(patients)} eligible female patients")
     return patients
 
 
-def create_mammogram_claim(patient):
-    """Create a mammogram claim for a patient."""
-    procedure = random.choice(MAMMOGRAM_CODES)
-    
-    # Random date within last 27 months (HEDIS measurement period)
-    days_ago = random.randint(0, 27 * 30)
-    claim_date = datetime.now() - timedelta(days=days_ago)
-    
-    # Realistic cost
-    cost = random.uniform(250, 400)
+def draw_mammogram_attributes(num_claims):
+    """
+    Draw the random values of num_claims claims in bulk.
+    Returns one list per build_mammogram_claim argument after the patient.
+    """
+    return (
+        random.choices(MAMMOGRAM_CODES, k=num_claims),
+        # Random date within last 27 months (HEDIS measurement period)
+        random.choices(range(27 * 30 + 1), k=num_claims),
+        # Realistic cost
+        [random.uniform(250, 400) for _ in range(num_claims)],
+    )
+
+
+def build_mammogram_claim(patient, procedure, days_ago, cost, now):
+    """Build a mammogram claim for a patient from pre-drawn random values."""
+    claim_date = now - timedelta(days=days_ago)
     
     claim = {
         'resourceType': 'Claim',
@@ -117,15 +164,33 @@ def create_mammogram_claim(patient):
         }
     }
     
+    return claim
+
+
+def post_claims(claims):
+    """POST claims as one transaction Bundle and return how many were created."""
+    bundle = {
+        'resourceType': 'Bundle',
+        'type': 'transaction',
+        'entry': [
+            {'resource': claim, 'request': {'method': 'POST', 'url': 'Claim'}}
+            for claim in claims
+        ]
+    }
+    
     try:
-        response = requests.post(
-            f'{FHIR_BASE}/Claim',
-            json=claim,
-            headers={'Content-Type': 'application/fhir+json'}
-        )
-        return response.status_code in [200, 201]
-    except Exception as e:
-        return False
+        response = SESSION.post(FHIR_BASE, json=bundle, timeout=120)
+    except requests.RequestException as e:
+        print(f"  ✗ Bundle of {len(claims)} claims failed: {e}")
+        return 0
+    if response.status_code not in [200, 201]:
+        print(f"  ✗ Bundle of {len(claims)} claims failed: {response.status_code} - {response.content[:200].decode('utf-8', 'replace')}")
+        return 0
+    
+    return sum(
+        1 for result in loads(response.content).get('entry', [])
+        if result.get('response', {}).get('status', '').startswith(('200', '201'))
+    )
 
 
 def main():
@@ -165,19 +230,24 @@ def main():
     
     print(f"\nGenerating claims...")
     created = 0
-    failed = 0
+    
+    now = datetime.now()
+    claims = [
+        build_mammogram_claim(patient, *drawn, now)
+        for patient, *drawn in zip(patients_to_screen, *draw_mammogram_attributes(num_to_create))
+    ]
     
     with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(create_mammogram_claim, p): p for p in patients_to_screen}
+        futures = {
+            executor.submit(post_claims, claims[i:i + CLAIMS_PER_BUNDLE]): i
+            for i in range(0, len(claims), CLAIMS_PER_BUNDLE)
+        }
         
         for future in as_completed(futures):
-            if future.result():
-                created += 1
-            else:
-                failed += 1
-            
-            if (created + failed) % 50 == 0:
-                print(f"  Progress: {created}/{num_to_create}")
+            created += future.result()
+            print(f"  Progress: {created}/{num_to_create}")
+    
+    failed = num_to_create - created
     
     print(f"\n{'='*60}")
     print(f"✓ Created {created} mammogram claims")
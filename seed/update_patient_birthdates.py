@@ -5,14 +5,37 @@ This script updates existing FHIR patients to have realistic birthdates that
 make them eligible for the HEDIS Breast Cancer Screening measure.
 """
 
+import base64
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import random
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
 
+# Optional accelerator for parsing search Bundles
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 FHIR_BASE = "http://localhost:8080/fhir"
 
+# Birthdate patches per batch Bundle POST
+PATIENTS_PER_BUNDLE = 100
+
+# Shared keep-alive connections; update_patients_parallel sizes the pool
+SESSION = requests.Session()
+SESSION.headers.update({'Accept': 'application/fhir+json'})
+
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
 
 def get_patients(gender='female', max_patients=2000):
     """Fetch patients from FHIR server."""
@@ -21,16 +44,18 @@ def get_patients(gender='female', max_patients=2000):
     
     params = {
         'gender': gender,
-        '_count': '200'
+        '_count': '200',
+        # Only what the updater and its preview use
+        '_elements': 'id,birthDate'
     }
     
     print(f"Fetching {gender} patients from FHIR server...")
     
     while len(all_patients) < max_patients:
         try:
-            response = requests.get(url, params=params, timeout=30)
+            response = SESSION.get(url, params=params, timeout=30)
             response.raise_for_status()
-            bundle = response.json()
+            bundle = loads(response.content)
             
             if 'entry' not in bundle:
                 break
@@ -63,10 +88,8 @@ def get_patients(gender='female', max_patients=2000):
     return all_patients[:max_patients]
 
 
-def generate_hedis_eligible_birthdate():
-    """Generate a birthdate that makes patient 50-74 years old."""
-    today = datetime.now()
-    
+def generate_hedis_eligible_birthdate(today):
+    """Generate a birthdate that makes patient 50-74 years old as of today."""
     # Random age between 50 and 74
     age_years = random.randint(50, 74)
     age_days = random.randint(0, 364)  # Random day within the year
@@ -77,36 +100,59 @@ def generate_hedis_eligible_birthdate():
     return birth_date.strftime('%Y-%m-%d')
 
 
-def update_patient_birthdate(patient):
-    """Update a single patient's birthdate."""
-    patient_id = patient.get('id')
-    current_birthdate = patient.get('birthDate', 'N/A')
+def update_patient_birthdates(patients):
+    """Update a batch of patients' birthdates with one batch Bundle."""
+    today = datetime.now()
+    new_birthdates = [generate_hedis_eligible_birthdate(today) for _ in patients]
+    
+    # PATCH only the birthDate instead of PUTting back the whole resource
+    # ("add" also sets it on patients that have none, unlike "replace").
+    # In a Bundle the JSON Patch travels as a base64 Binary.
+    bundle = {
+        'resourceType': 'Bundle',
+        'type': 'batch',
+        'entry': [{
+            'resource': {
+                'resourceType': 'Binary',
+                'contentType': 'application/json-patch+json',
+                'data': base64.b64encode(json.dumps(
+                    [{'op': 'add', 'path': '/birthDate', 'value': new_birthdate}]
+                ).encode()).decode()
+            },
+            'request': {'method': 'PATCH', 'url': f"Patient/{patient.get('id')}"}
+        } for patient, new_birthdate in zip(patients, new_birthdates)]
+    }
     
     try:
-        # Generate new birthdate
-        new_birthdate = generate_hedis_eligible_birthdate()
-        
-        # Update the patient resource
-        patient['birthDate'] = new_birthdate
-        
-        # PUT request to update patient
-        url = f"{FHIR_BASE}/Patient/{patient_id}"
-        response = requests.put(url, json=patient, timeout=30)
+        response = SESSION.post(
+            FHIR_BASE,
+            json=bundle,
+            headers={'Content-Type': 'application/fhir+json'},
+            timeout=120
+        )
         response.raise_for_status()
-        
-        return {
-            'success': True,
-            'patient_id': patient_id,
-            'old_birthdate': current_birthdate,
-            'new_birthdate': new_birthdate
-        }
-        
-    except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'patient_id': patient_id,
-            'error': str(e)
-        }
+        statuses = [entry.get('response', {}).get('status', '') for entry in loads(response.content).get('entry', [])]
+    except (requests.exceptions.RequestException, ValueError) as e:
+        statuses = [f"error: {e}"] * len(patients)
+    # A short response must not drop patients from the report
+    statuses += ['no response entry'] * (len(patients) - len(statuses))
+    
+    results = []
+    for patient, new_birthdate, status in zip(patients, new_birthdates, statuses):
+        if status.startswith('2'):
+            results.append({
+                'success': True,
+                'patient_id': patient.get('id'),
+                'old_birthdate': patient.get('birthDate', 'N/A'),
+                'new_birthdate': new_birthdate
+            })
+        else:
+            results.append({
+                'success': False,
+                'patient_id': patient.get('id'),
+                'error': status or 'no response entry'
+            })
+    return results
 
 
 def update_patients_parallel(patients, max_workers=10):
@@ -118,26 +164,30 @@ def update_patients_parallel(patients, max_workers=10):
     failed = 0
     errors = []
     
+    # One pooled connection per worker, reused for every update it sends
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers * 2, max_retries=3)
+    SESSION.mount('http://', adapter)
+    SESSION.mount('https://', adapter)
+    
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all update tasks
-        future_to_patient = {
-            executor.submit(update_patient_birthdate, patient): patient 
-            for patient in patients
-        }
+        # Submit one update Bundle per batch of patients
+        futures = [
+            executor.submit(update_patient_birthdates, patients[i:i + PATIENTS_PER_BUNDLE])
+            for i in range(0, len(patients), PATIENTS_PER_BUNDLE)
+        ]
         
         # Process completed updates
-        for i, future in enumerate(as_completed(future_to_patient), 1):
-            result = future.result()
-            
-            if result['success']:
-                successful += 1
-                if successful % 50 == 0:
-                    print(f"  ✓ Updated {successful}/{len(patients)} patients...")
-            else:
-                failed += 1
-                errors.append(result)
-                if failed <= 5:  # Show first 5 errors
-                    print(f"  ✗ Failed to update {result['patient_id']}: {result['error']}")
+        for future in as_completed(futures):
+            for result in future.result():
+                if result['success']:
+                    successful += 1
+                    if successful % 50 == 0:
+                        print(f"  ✓ Updated {successful}/{len(patients)} patients...")
+                else:
+                    failed += 1
+                    errors.append(result)
+                    if failed <= 5:  # Show first 5 errors
+                        print(f"  ✗ Failed to update {result['patient_id']}: {result['error']}")
     
     print(f"\n{'='*60}")
     print(f"Update Complete!")
@@ -186,15 +236,16 @@ def main():
     print("-" * 70)
     
     sample_patients = random.sample(patients, min(5, len(patients)))
+    today = datetime.now()
     for patient in sample_patients:
         patient_id = patient.get('id', 'N/A')
         old_birthdate = patient.get('birthDate', 'N/A')
-        new_birthdate = generate_hedis_eligible_birthdate()
+        new_birthdate = generate_hedis_eligible_birthdate(today)
         
         # Calculate age from new birthdate
         if new_birthdate != 'N/A':
             birth_year = int(new_birthdate.split('-')[0])
-            new_age = datetime.now().year - birth_year
+            new_age = today.year - birth_year
         else:
             new_age = 'N/A'
         
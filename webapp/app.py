@@ -2,13 +2,21 @@
 Flask web app for querying and visualizing FHIR claims data.
 Provides REST API endpoints and serves a charting dashboard.
 """
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, Response, render_template, jsonify, request, send_file
 import requests
 from datetime import datetime
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
 import io
+import functools
+from bisect import bisect_right
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from hedis_measure import (
+    SESSION,
+    loads,
     calculate_hedis_bcs_measure,
     calculate_hedis_col_measure,
     calculate_hedis_cdc_measure,
@@ -24,6 +32,174 @@ chat_agent = create_chat_agent()
 # FHIR server base URL - configurable via environment
 FHIR_BASE = os.getenv('FHIR_BASE_URL', 'http://hapi-fhir:8080/fhir')
 
+# Overall star rating by average HEDIS compliance rate: below 60, 60-70, ...
+STAR_RATING_THRESHOLDS = [60, 70, 80, 90]
+STAR_RATINGS = [
+    '⭐ (1 Star - Needs Improvement)',
+    '⭐⭐ (2 Stars - Fair)',
+    '⭐⭐⭐ (3 Stars - Good)',
+    '⭐⭐⭐⭐ (4 Stars - Very Good)',
+    '⭐⭐⭐⭐⭐ (5 Stars - Excellent)',
+]
+
+# Claim.status codes; /api/stats counts each one on the server
+CLAIM_STATUSES = ['active', 'cancelled', 'draft', 'entered-in-error']
+
+# The Claim elements /api/stats aggregates; its sample is fetched with only these
+STATS_ELEMENTS = 'status,created,total,patient,item'
+
+# Seconds an aggregate endpoint's response is served from memory; after
+# that it only stands in for a failed refresh, until CACHE_STALE_TTL
+CACHE_TTL = int(os.getenv('CACHE_TTL', '60'))
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', str(10 * CACHE_TTL)))
+CACHE_MAX_ENTRIES = 64
+
+# Dashboard polls that a background thread recomputes before their cache
+# entry expires, so requests never wait for the aggregation; a poll nobody
+# has read for PREFETCH_IDLE_TTL seconds is no longer refreshed
+PREFETCH_PATHS = ['/api/stats']
+PREFETCH_IDLE_TTL = int(os.getenv('PREFETCH_IDLE_TTL', '300'))
+
+# (path, query string) of each prefetched poll -> time it was last read
+_prefetch_reads = {}
+_prefetch_lock = threading.Lock()
+_prefetch_thread = None
+
+
+class ResponseCache:
+    """
+    Size-capped store of JSON response bodies. An entry is fresh for ttl
+    seconds and usable as a stale fallback until stale_ttl; older entries,
+    and the oldest ones beyond max_entries, are dropped.
+    """
+    
+    def __init__(self, ttl, stale_ttl, max_entries):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (time stored, body), oldest first
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return (body, is_fresh) for key, or None if there is no usable entry."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1], now - entry[0] < self.ttl
+    
+    def set(self, key, body):
+        """Store body under key, evicting expired and excess entries."""
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now, body)
+            self._evict(now)
+    
+    def _evict(self, now):
+        while self._entries:
+            key, (stored, _) = next(iter(self._entries.items()))
+            if now - stored < self.stale_ttl and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+
+RESPONSE_CACHE = ResponseCache(CACHE_TTL, CACHE_STALE_TTL, CACHE_MAX_ENTRIES)
+
+
+def cached_response(body, cache_status):
+    """Build a conditional (ETag, 304) JSON response from a cached body."""
+    response = Response(body, mimetype='application/json', headers={'X-Cache': cache_status})
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def cached(*arg_names):
+    """
+    Serve a JSON GET route from RESPONSE_CACHE, keyed by its path and the
+    query arguments in arg_names (the ones the view reads; any others don't
+    make new entries). When a refresh fails, the last good response is
+    returned instead, marked with an X-Cache: STALE header.
+    """
+    def decorator(view):
+        def cache_key():
+            return (request.path,) + tuple(request.args.get(name) for name in arg_names)
+        
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.path in PREFETCH_PATHS:
+                note_prefetch_read(urlencode([(name, request.args[name])
+                                              for name in arg_names if name in request.args]))
+            key = cache_key()
+            entry = RESPONSE_CACHE.get(key)
+            if entry and entry[1]:
+                return cached_response(entry[0], 'HIT')
+            
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                RESPONSE_CACHE.set(key, response.get_data())
+                return cached_response(response.get_data(), 'MISS')
+            if entry:
+                return cached_response(entry[0], 'STALE')
+            return response
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
+
+
+def note_prefetch_read(query_string):
+    """
+    Record a read of the current PREFETCH_PATHS poll and start this
+    process's prefetch thread if it isn't running. The thread is started
+    here rather than at import so each gunicorn worker gets its own after
+    the fork, and imports (tests, flask shell) don't start one at all.
+    """
+    global _prefetch_thread
+    if CACHE_TTL <= 0:
+        return
+    with _prefetch_lock:
+        _prefetch_reads[(request.path, query_string)] = time.monotonic()
+        if _prefetch_thread is None or not _prefetch_thread.is_alive():
+            _prefetch_thread = threading.Thread(target=prefetch_responses, name='prefetch', daemon=True)
+            _prefetch_thread.start()
+
+
+def prefetch_responses():
+    """
+    Recompute recently read PREFETCH_PATHS polls into the response cache
+    every CACHE_TTL / 2 seconds, exiting once none has been read for
+    PREFETCH_IDLE_TTL (the next read starts a new thread).
+    """
+    global _prefetch_thread
+    while True:
+        time.sleep(CACHE_TTL / 2)
+        now = time.monotonic()
+        with _prefetch_lock:
+            for poll, last_read in list(_prefetch_reads.items()):
+                if now - last_read >= PREFETCH_IDLE_TTL:
+                    del _prefetch_reads[poll]
+            if not _prefetch_reads:
+                _prefetch_thread = None
+                return
+            polls = list(_prefetch_reads)
+        
+        for path, query_string in polls:
+            url = f"{path}?{query_string}" if query_string else path
+            with app.test_request_context(path, query_string=query_string):
+                try:
+                    view = app.view_functions[request.url_rule.endpoint]
+                    response = app.make_response(view.__wrapped__())
+                except Exception as e:
+                    print(f"Prefetching {url} failed: {e}")
+                    continue
+                if response.status_code == 200:
+                    RESPONSE_CACHE.set(view.cache_key(), response.get_data())
+                else:
+                    body = response.get_data()[:200].decode('utf-8', 'replace').strip()
+                    print(f"Prefetching {url} returned {response.status_code}: {body}")
+
 
 @app.after_request
 def disable_csp(response):
@@ -38,15 +214,58 @@ def disable_csp(response):
 
 def query_fhir(resource_type, params=None):
     """Query FHIR server and return results."""
-    url = f"{FHIR_BASE}/{resource_type}"
+    return fetch_fhir(f"{FHIR_BASE}/{resource_type}", params)
+
+
+def fetch_fhir(url, params=None):
+    """GET a FHIR URL (a search or a paging link) and return the parsed result."""
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = SESSION.get(url, params=params, timeout=30)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return loads(response.content)
+    # ValueError: the response body was not JSON
+    except (requests.RequestException, ValueError) as e:
         return {"error": str(e)}
 
 
+def next_page_url(bundle):
+    """
+    Return the URL of a search Bundle's next page on FHIR_BASE, or None.
+    HAPI writes paging links with its configured server_address (localhost
+    in docker-compose), so only the link's query string is kept.
+    """
+    url = next((l['url'] for l in bundle.get('link', []) if l['relation'] == 'next'), None)
+    if url is None:
+        return None
+    return f"{FHIR_BASE}?{urlsplit(url).query}"
+
+
+def page_urls(next_url, end):
+    """
+    Derive the URLs of the consecutive pages from next_url up to result
+    index end. HAPI paging links carry _getpagesoffset and _count, so later
+    pages only differ in the offset, stepped by _count; returns None when the
+    link lacks either (walk the links instead).
+    """
+    parts = urlsplit(next_url)
+    query = parse_qsl(parts.query)
+    params = dict(query)
+    try:
+        offset = int(params['_getpagesoffset'])
+        step = int(params['_count'])
+    except (KeyError, ValueError):
+        return None
+    if step <= 0:
+        return None
+    return [
+        urlunsplit(parts._replace(query=urlencode([
+            (k, str(page_offset)) if k == '_getpagesoffset' else (k, v)
+            for k, v in query
+        ])))
+        for page_offset in range(offset, end, step)
+    ]
+
+
 def extract_claims_from_bundle(bundle):
     """Extract claim resources from a FHIR Bundle."""
     if 'entry' not in bundle:
@@ -54,6 +273,35 @@ def extract_claims_from_bundle(bundle):
     return [entry['resource'] for entry in bundle['entry'] if entry.get('resource')]
 
 
+def aggregate_by_month(claims):
+    """
+    Count claims and sum their totals per created month (YYYY-MM).
+    Returns (count by month, cost by month, total cost).
+    """
+    by_month = defaultdict(int)
+    cost_by_month = defaultdict(float)
+    total_cost = 0.0
+    
+    for claim in claims:
+        # created is an ISO 8601 dateTime, so its month is the first 7
+        # characters; no need to parse the whole timestamp
+        month_key = str(claim.get('created', ''))[:7]
+        if month_key[4:5] != '-' or not (month_key[:4] + month_key[5:]).isdigit():
+            continue
+        by_month[month_key] += 1
+        
+        total = claim.get('total', {})
+        if 'value' in total:
+            try:
+                cost = float(total['value'])
+            except (ValueError, TypeError):
+                continue
+            cost_by_month[month_key] += cost
+            total_cost += cost
+    
+    return by_month, cost_by_month, total_cost
+
+
 @app.route('/')
 def index():
     """Serve the main dashboard page."""
@@ -73,11 +321,15 @@ def get_claims():
         params['status'] = request.args.get('status')
     if request.args.get('patient'):
         params['patient'] = request.args.get('patient')
+    # A date range is two created parameters (created=geX&created=leY);
+    # requests repeats the parameter for a list value
+    created = []
     if request.args.get('created_from'):
-        params['created'] = f"ge{request.args.get('created_from')}"
+        created.append(f"ge{request.args.get('created_from')}")
     if request.args.get('created_to'):
-        created_param = params.get('created', '')
-        params['created'] = f"{created_param}&le{request.args.get('created_to')}"
+        created.append(f"le{request.args.get('created_to')}")
+    if created:
+        params['created'] = created
     
     bundle = query_fhir('Claim', params)
     if 'error' in bundle:
@@ -91,37 +343,56 @@ def get_claims():
 
 
 @app.route('/api/stats')
+@cached()
 def get_stats():
     """Get aggregated statistics for charting."""
     try:
-        # Get summary count first
-        count_bundle = query_fhir('Claim', {'_summary': 'count'})
-        total_claims = count_bundle.get('total', 0)
-        
-        # For large datasets (>10K claims), sample to avoid timeouts
-        # Load enough claims to get accurate statistics without timing out
-        sample_size = min(total_claims, 10000)  # Sample up to 10K claims
-        all_claims = []
-        params = {'_count': '1000'}
-        max_pages = (sample_size // 1000) + 1  # Only load what we need
-        
-        for page in range(max_pages):
-            bundle = query_fhir('Claim', params)
-            if 'error' in bundle:
-                return jsonify({'error': bundle['error']}), 500
+        # The summary counts (the total, and each status exactly) and the
+        # first sample page are independent, so they are all sent at once
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            count_future = executor.submit(query_fhir, 'Claim', {'_summary': 'count'})
+            status_futures = [
+                executor.submit(query_fhir, 'Claim', {'_summary': 'count', 'status': status})
+                for status in CLAIM_STATUSES
+            ]
+            first_page = executor.submit(query_fhir, 'Claim', {'_count': '1000', '_elements': STATS_ELEMENTS})
             
-            claims = extract_claims_from_bundle(bundle)
-            all_claims.extend(claims)
+            total_claims = count_future.result().get('total', 0)
+            status_bundles = [future.result() for future in status_futures]
+            if all('total' in bundle for bundle in status_bundles):
+                exact_by_status = {
+                    status: bundle['total']
+                    for status, bundle in zip(CLAIM_STATUSES, status_bundles)
+                    if bundle['total']
+                }
+            else:
+                exact_by_status = None
             
-            # Stop if we have enough claims for sampling
-            if len(all_claims) >= sample_size:
-                break
+            # For large datasets (>10K claims), sample to avoid timeouts
+            # Load enough claims to get accurate statistics without timing out
+            sample_size = min(total_claims, 10000)  # Sample up to 10K claims
+            bundle = first_page.result()
+            if 'error' in bundle:
+                return jsonify({'error': bundle['error']}), 500
+            all_claims = extract_claims_from_bundle(bundle)
             
-            # Check for next page
-            links = bundle.get('link', [])
-            next_link = next((l for l in links if l['relation'] == 'next'), None)
-            if not next_link:
-                break
+            # Fetch the remaining pages of the sample concurrently when their
+            # URLs can be derived from the first next link, else walk the links
+            next_url = next_page_url(bundle)
+            if next_url and len(all_claims) < sample_size:
+                urls = page_urls(next_url, sample_size)
+                if urls:
+                    for bundle in executor.map(fetch_fhir, urls):
+                        if 'error' in bundle:
+                            return jsonify({'error': bundle['error']}), 500
+                        all_claims.extend(extract_claims_from_bundle(bundle))
+                else:
+                    while next_url and len(all_claims) < sample_size:
+                        bundle = fetch_fhir(next_url)
+                        if 'error' in bundle:
+                            return jsonify({'error': bundle['error']}), 500
+                        all_claims.extend(extract_claims_from_bundle(bundle))
+                        next_url = next_page_url(bundle)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -129,80 +400,51 @@ def get_stats():
     scaling_factor = total_claims / len(all_claims) if len(all_claims) > 0 else 1.0
     is_sampled = len(all_claims) < total_claims
     
-    # Aggregate data
-    stats = {
-        'total_claims': len(all_claims),
-        'by_status': defaultdict(int),
-        'by_month': defaultdict(int),
-        'by_patient': defaultdict(int),
-        'top_procedures': Counter(),
-        'cost_by_month': defaultdict(float),
-        'total_cost': 0.0
-    }
-    
-    for claim in all_claims:
-        # Status distribution
-        status = claim.get('status', 'unknown')
-        stats['by_status'][status] += 1
-        
-        # Claims by month
-        created = claim.get('created', '')
-        if created:
-            try:
-                date_obj = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                month_key = date_obj.strftime('%Y-%m')
-                stats['by_month'][month_key] += 1
-                
-                # Cost by month
-                total = claim.get('total', {})
-                if 'value' in total:
-                    cost = float(total['value'])
-                    stats['cost_by_month'][month_key] += cost
-                    stats['total_cost'] += cost
-            except (ValueError, AttributeError):
-                pass
-        
-        # Patient distribution
-        patient_ref = claim.get('patient', {}).get('reference', 'Unknown')
-        stats['by_patient'][patient_ref] += 1
-        
-        # Procedures/CPT codes
-        items = claim.get('item', [])
-        for item in items:
-            service = item.get('productOrService', {})
-            codings = service.get('coding', [])
-            for coding in codings:
-                code = coding.get('code')
-                display = coding.get('display', code)
-                if code:
-                    stats['top_procedures'][display] += 1
+    # Aggregate data. Plain counts go through Counter, whose counting loop
+    # runs in C; only the month/cost pass needs a Python loop.
+    by_patient = Counter(claim.get('patient', {}).get('reference', 'Unknown') for claim in all_claims)
+    top_procedures = Counter(
+        coding.get('display', coding['code'])
+        for claim in all_claims
+        for item in claim.get('item', [])
+        for coding in item.get('productOrService', {}).get('coding', [])
+        if coding.get('code')
+    )
+    by_month, cost_by_month, total_cost = aggregate_by_month(all_claims)
     
     # Scale up counts if we sampled the data
     if is_sampled:
-        scaled_by_month = {k: int(v * scaling_factor) for k, v in stats['by_month'].items()}
-        scaled_cost_by_month = {k: round(v * scaling_factor, 2) for k, v in stats['cost_by_month'].items()}
-        scaled_by_status = {k: int(v * scaling_factor) for k, v in stats['by_status'].items()}
+        scaled_by_month = {k: int(v * scaling_factor) for k, v in by_month.items()}
+        scaled_cost_by_month = {k: round(v * scaling_factor, 2) for k, v in cost_by_month.items()}
+    else:
+        scaled_by_month = dict(by_month)
+        scaled_cost_by_month = dict(cost_by_month)
+    
+    # Statuses are exact server counts; estimate them from the sample only
+    # if those queries failed
+    if exact_by_status is not None:
+        scaled_by_status = exact_by_status
     else:
-        scaled_by_month = dict(stats['by_month'])
-        scaled_cost_by_month = dict(stats['cost_by_month'])
-        scaled_by_status = dict(stats['by_status'])
+        by_status = Counter(claim.get('status', 'unknown') for claim in all_claims)
+        scaled_by_status = {k: int(v * scaling_factor) for k, v in by_status.items()}
     
     # Convert to serializable format
     return jsonify({
         'total_claims': total_claims,  # Use actual total from count query
-        'total_cost': round(stats['total_cost'] * scaling_factor, 2),
+        'total_cost': round(total_cost * scaling_factor, 2),
         'by_status': scaled_by_status,
         'by_month': dict(sorted(scaled_by_month.items())),
         'cost_by_month': dict(sorted(scaled_cost_by_month.items())),
-        'top_patients': dict(sorted(stats['by_patient'].items(), key=lambda x: x[1], reverse=True)[:10]),
-        'unique_patient_count': len(stats['by_patient']),  # Total unique patients
-        'top_procedures': dict(stats['top_procedures'].most_common(10)),
+        'top_patients': dict(by_patient.most_common(10)),
+        'unique_patient_count': len(by_patient),  # Total unique patients
+        'top_procedures': dict(top_procedures.most_common(10)),
         'is_sampled': is_sampled,
         'sample_size': len(all_claims)
     })
 
 
 @app.route('/api/mammogram-stats')
+@cached()
 def get_mammogram_stats():
     """Get statistics specific to mammogram claims using procedure codes."""
     try:
@@ -221,23 +463,18 @@ def get_mammogram_stats():
         if 'error' not in bundle:
             claims = extract_claims_from_bundle(bundle)
             
-            # Filter for only mammogram claims (codes starting with 770)
+            # Filter for only mammogram claims (codes starting with 770),
+            # keeping their mammogram codings for the procedure counts
             for claim in claims:
-                items = claim.get('item', [])
-                is_mammogram = False
-                for item in items:
-                    service = item.get('productOrService', {})
-                    codings = service.get('coding', [])
-                    for coding in codings:
-                        code = coding.get('code', '')
-                        if code.startswith('770'):  # Mammogram codes
-                            is_mammogram = True
-                            break
-                    if is_mammogram:
-                        break
+                mammo_codings = [
+                    coding
+                    for item in claim.get('item', [])
+                    for coding in item.get('productOrService', {}).get('coding', [])
+                    if (coding.get('code') or '').startswith('770')  # Mammogram codes
+                ]
                 
-                if is_mammogram:
-                    all_mammo_claims.append(claim)
+                if mammo_codings:
+                    all_mammo_claims.append((claim, mammo_codings))
                     patient_ref = claim.get('patient', {}).get('reference', '')
                     if patient_ref:
                         mammo_patients.add(patient_ref)
@@ -256,37 +493,15 @@ def get_mammogram_stats():
         
         # Calculate stats from sample
         procedure_counts = Counter()
-        by_month = defaultdict(int)
-        cost_by_month = defaultdict(float)
-        total_cost = 0.0
-        
-        for claim in all_mammo_claims:
+        for claim, mammo_codings in all_mammo_claims:
             # Count by procedure
-            items = claim.get('item', [])
-            for item in items:
-                service = item.get('productOrService', {})
-                codings = service.get('coding', [])
-                for coding in codings:
-                    code = coding.get('code')
-                    display = coding.get('display', 'Unknown')
-                    if code and code.startswith('770'):  # Mammogram codes
-                        procedure_counts[f"{code} - {display}"] += 1
-            
-            # Monthly stats
-            created = claim.get('created', '')
-            if created:
-                try:
-                    date_obj = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                    month_key = date_obj.strftime('%Y-%m')
-                    by_month[month_key] += 1
-                    
-                    total = claim.get('total', {})
-                    if 'value' in total:
-                        cost = float(total['value'])
-                        cost_by_month[month_key] += cost
-                        total_cost += cost
-                except (ValueError, AttributeError):
-                    pass
+            for coding in mammo_codings:
+                procedure_counts[f"{coding['code']} - {coding.get('display', 'Unknown')}"] += 1
+        
+        # Monthly stats
+        by_month, cost_by_month, total_cost = aggregate_by_month(
+            claim for claim, _ in all_mammo_claims
+        )
         
         return jsonify({
             'total_mammogram_claims': len(all_mammo_claims),
@@ -323,7 +538,7 @@ def health():
     """Health check endpoint."""
     try:
         # Check if FHIR server is reachable
-        response = requests.get(f"{FHIR_BASE}/metadata", timeout=5)
+        response = SESSION.get(f"{FHIR_BASE}/metadata", timeout=5)
         fhir_status = "up" if response.status_code == 200 else "down"
     except:
         fhir_status = "down"
@@ -335,6 +550,7 @@ def health():
 
 
 @app.route('/api/hedis-bcs')
+@cached('max_patients')
 def get_hedis_bcs_measure():
     """
     Calculate HEDIS Breast Cancer Screening measure.
@@ -353,6 +569,7 @@ def get_hedis_bcs_measure():
 
 
 @app.route('/api/hedis-col')
+@cached('max_patients')
 def get_hedis_col_measure():
     """
     Calculate HEDIS Colorectal Cancer Screening measure.
@@ -371,6 +588,7 @@ def get_hedis_col_measure():
 
 
 @app.route('/api/hedis-cdc')
+@cached('max_patients')
 def get_hedis_cdc_measure():
     """
     Calculate HEDIS Comprehensive Diabetes Care measure.
@@ -389,6 +607,7 @@ def get_hedis_cdc_measure():
 
 
 @app.route('/api/hedis-cbp')
+@cached('max_patients')
 def get_hedis_cbp_measure():
     """
     Calculate HEDIS Controlling High Blood Pressure measure.
@@ -407,6 +626,7 @@ def get_hedis_cbp_measure():
 
 
 @app.route('/api/hedis-summary')
+@cached('max_patients')
 def get_hedis_summary():
     """
     Get summary of all HEDIS measures at once.
@@ -418,11 +638,16 @@ def get_hedis_summary():
         max_patients = int(request.args.get('max_patients', 500))
         max_patients = min(max_patients, 2000)
         
-        # Calculate all measures
-        bcs_results = calculate_hedis_bcs_measure(FHIR_BASE, max_patients)
-        col_results = calculate_hedis_col_measure(FHIR_BASE, max_patients)
-        cdc_results = calculate_hedis_cdc_measure(FHIR_BASE, max_patients)
-        cbp_results = calculate_hedis_cbp_measure(FHIR_BASE, max_patients)
+        # Calculate all measures concurrently; each one waits on FHIR queries
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            bcs_future = executor.submit(calculate_hedis_bcs_measure, FHIR_BASE, max_patients)
+            col_future = executor.submit(calculate_hedis_col_measure, FHIR_BASE, max_patients)
+            cdc_future = executor.submit(calculate_hedis_cdc_measure, FHIR_BASE, max_patients)
+            cbp_future = executor.submit(calculate_hedis_cbp_measure, FHIR_BASE, max_patients)
+        bcs_results = bcs_future.result()
+        col_results = col_future.result()
+        cdc_results = cdc_future.result()
+        cbp_results = cbp_future.result()
         
         # Calculate overall star rating based on average compliance
         rates = []
@@ -432,16 +657,7 @@ def get_hedis_summary():
         
         avg_rate = sum(rates) / len(rates) if rates else 0
         
-        if avg_rate >= 90:
-            star_rating = '⭐⭐⭐⭐⭐ (5 Stars - Excellent)'
-        elif avg_rate >= 80:
-            star_rating = '⭐⭐⭐⭐ (4 Stars - Very Good)'
-        elif avg_rate >= 70:
-            star_rating = '⭐⭐⭐ (3 Stars - Good)'
-        elif avg_rate >= 60:
-            star_rating = '⭐⭐ (2 Stars - Fair)'
-        else:
-            star_rating = '⭐ (1 Star - Needs Improvement)'
+        star_rating = STAR_RATINGS[bisect_right(STAR_RATING_THRESHOLDS, avg_rate)]
         
         return jsonify({
             'summary': {
@@ -9,7 +9,35 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from collections import defaultdict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Tuple, Any
+import json
+
+# Optional accelerator for parsing FHIR Bundles
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keep-alive connections to the FHIR server shared by every measure
+# calculator and the web app's request threads; GETs retry on gateway errors
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount('http://', _ADAPTER)
+SESSION.mount('https://', _ADAPTER)
+
+
+def loads(data):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
 
 # Mammography CPT codes
 MAMMOGRAPHY_CODES = ['77065', '77066', '77067', '77063', '77061', '77062']
@@ -38,14 +66,15 @@ class HEDISBreastCancerScreening:
     def query_fhir(self, resource_type: str, params: dict) -> dict:
         """Query FHIR server and return bundle."""
         try:
-            response = requests.get(
+            response = SESSION.get(
                 f"{self.fhir_base_url}/{resource_type}",
                 params=params,
                 timeout=120
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads(response.content)
+        # ValueError: the response body was not JSON
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {'error': str(e)}
     
     def get_patient_age(self, birth_date_str: str) -> int:
@@ -322,14 +351,15 @@ class HEDISColorectalCancerScreening:
     def query_fhir(self, resource_type: str, params: dict) -> dict:
         """Query FHIR server and return bundle."""
         try:
-            response = requests.get(
+            response = SESSION.get(
                 f"{self.fhir_base_url}/{resource_type}",
                 params=params,
                 timeout=120
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads(response.content)
+        # ValueError: the response body was not JSON
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {'error': str(e)}
     
     def get_patient_age(self, birth_date_str: str) -> int:
@@ -496,14 +526,15 @@ class HEDISDiabetesCare:
     def query_fhir(self, resource_type: str, params: dict) -> dict:
         """Query FHIR server and return bundle."""
         try:
-            response = requests.get(
+            response = SESSION.get(
                 f"{self.fhir_base_url}/{resource_type}",
                 params=params,
                 timeout=120
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads(response.content)
+        # ValueError: the response body was not JSON
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {'error': str(e)}
     
     def get_patient_age(self, birth_date_str: str) -> int:
@@ -682,14 +713,15 @@ class HEDISControllingBloodPressure:
     def query_fhir(self, resource_type: str, params: dict) -> dict:
         """Query FHIR server and return bundle."""
         try:
-            response = requests.get(
+            response = SESSION.get(
                 f"{self.fhir_base_url}/{resource_type}",
                 params=params,
                 timeout=120
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads(response.content)
+        # ValueError: the response body was not JSON
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {'error': str(e)}
     
     def get_patient_age(self, birth_date_str: str) -> int:
@@ -0,0 +1,93 @@
+"""
+Tests for the /api/stats paging against a stub FHIR server.
+
+Run from webapp/: python -m unittest test_app
+"""
+import json
+import os
+import sys
+import threading
+import types
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Serve every request fresh, and keep the RAG chat agent out of the import
+os.environ['CACHE_TTL'] = '0'
+chat_agent_stub = types.ModuleType('chat_agent')
+chat_agent_stub.create_chat_agent = lambda: None
+sys.modules.setdefault('chat_agent', chat_agent_stub)
+
+import app  # noqa: E402
+
+TOTAL_CLAIMS = 450
+MAX_PAGE_SIZE = 200
+# Where HAPI's server_address points; not reachable from the webapp
+LINK_BASE = 'http://localhost.invalid:8080/fhir'
+
+
+class StubFHIRHandler(BaseHTTPRequestHandler):
+    """Claim searches paged like HAPI: _count capped, next links on LINK_BASE."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        if '_summary' in query:
+            total = 0 if 'status' in query else TOTAL_CLAIMS
+            return self.send_json({'resourceType': 'Bundle', 'total': total})
+
+        offset = int(query.get('_getpagesoffset', ['0'])[0])
+        count = min(int(query.get('_count', ['100'])[0]), MAX_PAGE_SIZE)
+        entries = [
+            {'resource': {'resourceType': 'Claim', 'id': str(i), 'status': 'active',
+                          'created': '2025-01-15', 'total': {'value': 1.0}}}
+            for i in range(offset, min(offset + count, TOTAL_CLAIMS))
+        ]
+        links = []
+        if offset + count < TOTAL_CLAIMS:
+            links.append({'relation': 'next', 'url': (
+                f"{LINK_BASE}?_getpages=abc&_getpagesoffset={offset + count}"
+                f"&_count={count}&_bundletype=searchset")})
+        self.send_json({'resourceType': 'Bundle', 'entry': entries, 'link': links})
+
+    def send_json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/fhir+json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StatsPagingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubFHIRHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.fhir_base = app.FHIR_BASE
+        app.FHIR_BASE = f"http://127.0.0.1:{cls.server.server_port}/fhir"
+
+    @classmethod
+    def tearDownClass(cls):
+        app.FHIR_BASE = cls.fhir_base
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_next_page_url_is_rebuilt_on_fhir_base(self):
+        bundle = {'link': [{'relation': 'next', 'url': f"{LINK_BASE}?_getpages=abc&_getpagesoffset=200&_count=200"}]}
+        self.assertEqual(app.next_page_url(bundle),
+                         f"{app.FHIR_BASE}?_getpages=abc&_getpagesoffset=200&_count=200")
+
+    def test_stats_follows_next_links_on_another_host(self):
+        response = app.app.test_client().get('/api/stats')
+        self.assertEqual(response.status_code, 200)
+        stats = response.get_json()
+        self.assertEqual(stats['sample_size'], TOTAL_CLAIMS)
+        self.assertEqual(stats['total_cost'], TOTAL_CLAIMS * 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()